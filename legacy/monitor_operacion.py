@@ -15,17 +15,16 @@ import numpy as np
 import argparse
 import time
 import os
+import sys
 from collections import deque
 from datetime import datetime
+from pathlib import Path
 
-# ---------- Utils ----------
-def moving_avg(vals, k):
-    if not vals:
-        return 0.0
-    if len(vals) < k:
-        return float(np.mean(vals))
-    return float(np.mean(list(vals)[-k:]))
+# filtros O(1) del paquete: la raíz del repo va en sys.path (como main.py) para no depender de pip
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.utils.smoothing import SMOOTHERS, make_smoother
 
+# ---------- Utils ----------
 def put_text(img, text, org, scale=0.8, color=(255,255,255), thick=2):
     cv2.putText(img, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, (0,0,0), thick+2, cv2.LINE_AA)
     cv2.putText(img, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thick, cv2.LINE_AA)
@@ -69,6 +68,8 @@ ap.add_argument("--blur", type=int, default=5, help="Kernel gaussiano (impar)")
 ap.add_argument("--diff_thr", type=int, default=18, help="Umbral de diferencia [0-255]")
 ap.add_argument("--min_area_pct", type=float, default=0.002, help="Fracción mínima de pixeles activos")
 ap.add_argument("--smooth_k", type=int, default=8, help="Ventana de media móvil del score")
+ap.add_argument("--smoother", choices=sorted(SMOOTHERS), default="sma",
+                help="Filtro del score (src/utils/smoothing.py)")
 ap.add_argument("--up_threshold", type=float, default=0.015, help="Umbral para entrar en operación")
 ap.add_argument("--down_threshold", type=float, default=0.010, help="Umbral para considerar inactividad")
 ap.add_argument("--min_active_sec", type=float, default=0.5, help="Antirebote para activar operación")
@@ -110,6 +111,7 @@ prev = cv2.GaussianBlur(prev, (args.blur, args.blur), 0)
 # Estado continuo
 status = "IDLE"                 # "IDLE" | "OPERACION"
 score_hist = deque(maxlen=max(10, args.smooth_k))
+smoother = make_smoother(args.smoother, args.smooth_k)
 last_change = time.time()
 fps_est, frames_cnt, t_fps = 0.0, 0, time.time()
 
@@ -149,7 +151,7 @@ while True:
     frac   = active / max(1.0, total)
     score  = max(frac, args.min_area_pct if frac >= args.min_area_pct else 0.0)
     score_hist.append(score)
-    score_s = moving_avg(score_hist, args.smooth_k)
+    score_s = smoother.update(score)
 
     now = time.time()
     frames_cnt += 1
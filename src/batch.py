@@ -0,0 +1,143 @@
+"""Batch processing of whole video directories on a process pool.
+
+``python -m src batch data/raw_videos --workers 8`` runs the headless monitor
+on every video in parallel (one file per worker process, each with its own
+engine from :func:`src.cli.make_engine`) and writes all intervals to a single
+merged CSV sorted by start time.
+
+Files are timed with their media clock, anchored to when each one was
+recorded (:func:`src.utils.clock.file_origin`): the date-time stamp in its
+name (``linea3_2026-01-01_0800.mp4``) or, failing that, its mtime minus its
+duration.  ``--start_time`` overrides the anchor and is only accepted for a
+single file, since every file would otherwise start at the same instant.
+
+With ``--state_dir`` the files of each camera (see
+:func:`src.io.snapshots.camera_key`) run in name order on the same worker, so
+every file starts from the background model the previous one left behind.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import multiprocessing as mp
+import os
+import time
+from datetime import datetime
+
+import cv2
+
+from .cli import add_processing_arguments, hms, list_videos, run_monitor
+from .io.recorders import CSVRecorder
+from .io.snapshots import camera_key
+from .utils.clock import file_origin
+
+
+def expand_inputs(inputs: list[str]) -> list[str]:
+    """Resolve directories and glob patterns into a sorted, de-duplicated file list."""
+
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            found.extend(list_videos(item))
+        elif glob.has_magic(item):
+            found.extend(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+        elif os.path.isfile(item):
+            found.append(item)
+        else:
+            print(f"[WARN] Entrada ignorada (no existe): {item}")
+    return sorted(dict.fromkeys(found))
+
+
+def _init_worker() -> None:
+    # Cada proceso ya es un núcleo: evitar que OpenCV abra su propio pool de hilos.
+    cv2.setNumThreads(1)
+
+
+def _process_one(task):
+    path, args = task
+    args = argparse.Namespace(**vars(args))
+    args.src = path
+    if not args.start_time:
+        args.start_time = datetime.fromtimestamp(file_origin(path)).isoformat()
+    intervals = []
+    try:
+        summary = run_monitor(args, on_interval=lambda src, a, b: intervals.append((src, a, b)),
+                              verbose=False)
+    except Exception as exc:  # un archivo corrupto no debe tumbar el lote
+        return {"src": path, "error": str(exc), "intervals": []}
+    summary["intervals"] = intervals
+    return summary
+
+
+def _process_chain(task):
+    """Archivos consecutivos de una misma cámara, en orden (cada uno arranca del snapshot anterior)."""
+    paths, args = task
+    return [_process_one((path, args)) for path in paths]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        prog="python -m src batch",
+        description="Procesa en paralelo todos los videos de un directorio o patrón glob.",
+    )
+    ap.add_argument("inputs", nargs="+", help="Directorios, archivos o patrones glob (ej. 'data/raw_videos/*.mp4')")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Procesos en paralelo (por defecto: núcleos disponibles)")
+    add_processing_arguments(ap)
+    ap.set_defaults(csv="outputs/csv/operacion_batch.csv")
+    return ap
+
+
+def main(argv=None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    videos = expand_inputs(args.inputs)
+    if not videos:
+        print("No se encontraron videos para procesar.")
+        return
+    if args.start_time and len(videos) > 1:
+        parser.error("--start_time ancla un solo archivo; en lote cada archivo se ancla con la "
+                     "fecha de su nombre o, si no la tiene, con su mtime menos su duración.")
+
+    # Opciones de la CLI interactiva que no aplican en lote
+    args.headless = True
+    args.out = ""
+    args.display_width = args.width
+    args.progress_sec = float("inf")
+    args.clock = "media" if args.clock == "auto" else args.clock
+
+    chains = {}
+    for path in videos:
+        key = (args.state_key or camera_key(path)) if args.state_dir else path
+        chains.setdefault(key, []).append(path)
+    tasks = [(paths, args) for paths in chains.values()]
+    workers = max(1, min(args.workers, len(tasks)))
+    print(f"[OK] Lote: {len(videos)} videos con {workers} procesos"
+          + (f" ({len(tasks)} cámaras en orden, con snapshots)." if args.state_dir else "."))
+    t0 = time.time()
+    results = []
+    with mp.Pool(workers, initializer=_init_worker) as pool:
+        for chain in pool.imap_unordered(_process_chain, tasks):
+            for res in chain:
+                results.append(res)
+                name = os.path.basename(res["src"])
+                if "error" in res:
+                    print(f"[ERR] {len(results)}/{len(videos)} {name}: {res['error']}")
+                else:
+                    print(f"[OK] {len(results)}/{len(videos)} {name}: {res['frames']} frames, "
+                          f"{len(res['intervals'])} intervalos ({res['elapsed']:.1f}s)")
+
+    intervals = sorted((iv for res in results for iv in res["intervals"]), key=lambda iv: (iv[1], iv[0]))
+    if args.csv:
+        csv_rec = CSVRecorder(args.csv)
+        for src, start_ts, end_ts in intervals:
+            csv_rec.append_interval(src, start_ts, end_ts)
+
+    elapsed = time.time() - t0
+    frames = sum(res.get("frames", 0) for res in results)
+    errors = sum(1 for res in results if "error" in res)
+    print(f"[OK] Lote terminado en {hms(elapsed)}: {frames} frames ({frames / max(1e-6, elapsed):.1f} fps), "
+          f"{len(intervals)} intervalos, {errors} errores.")
+    if args.csv:
+        print(f"[OK] CSV combinado: {args.csv}")
@@ -0,0 +1 @@
+"""Benchmarks for the motion pipeline (run with ``python -m src.bench.<name>``)."""
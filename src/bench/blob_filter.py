@@ -0,0 +1,73 @@
+"""Micro-benchmark: per-blob loop vs. LUT area filter.
+
+Usage::
+
+    python -m src.bench.blob_filter --width 960 --height 540 --blobs 10 100 500 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from ..pipeline.postprocess import filter_small_blobs
+
+
+def filter_small_blobs_loop(mask, min_area_px):
+    """Reference implementation: one full-frame scan per component."""
+    num, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if num <= 1:
+        return mask
+    keep = np.zeros_like(mask)
+    for i in range(1, num):
+        if stats[i, cv2.CC_STAT_AREA] >= min_area_px:
+            keep[labels == i] = 255
+    return keep
+
+
+def make_blob_mask(width, height, n_blobs, seed=0):
+    """Binary mask with ``n_blobs`` rectangles, roughly half below 80 px."""
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((height, width), np.uint8)
+    for _ in range(n_blobs):
+        side = int(rng.choice((4, 6, 12, 16)))
+        x = int(rng.integers(0, width - side))
+        y = int(rng.integers(0, height - side))
+        mask[y:y + side, x:x + side] = 255
+    return mask
+
+
+def _time_ms(fn, mask, min_area_px, repeat):
+    fn(mask, min_area_px)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(mask, min_area_px)
+    return (time.perf_counter() - t0) * 1000.0 / repeat
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark del filtro de blobs por área.")
+    ap.add_argument("--width", type=int, default=960)
+    ap.add_argument("--height", type=int, default=540)
+    ap.add_argument("--min_blob_area_px", type=int, default=80)
+    ap.add_argument("--blobs", type=int, nargs="+", default=[0, 10, 50, 100, 250, 500, 1000])
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args(argv)
+
+    print(f"{'blobs':>6} {'comps':>6} {'loop_ms':>9} {'lut_ms':>8} {'speedup':>8}")
+    for n in args.blobs:
+        mask = make_blob_mask(args.width, args.height, n)
+        num = cv2.connectedComponents(mask, connectivity=8)[0] - 1
+        ref = filter_small_blobs_loop(mask, args.min_blob_area_px)
+        if not np.array_equal(ref, filter_small_blobs(mask, args.min_blob_area_px)):
+            raise AssertionError(f"Resultados distintos con {n} blobs")
+        t_loop = _time_ms(filter_small_blobs_loop, mask, args.min_blob_area_px, args.repeat)
+        t_lut = _time_ms(filter_small_blobs, mask, args.min_blob_area_px, args.repeat)
+        print(f"{n:>6} {num:>6} {t_loop:>9.3f} {t_lut:>8.3f} {t_loop / max(t_lut, 1e-9):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
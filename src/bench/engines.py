@@ -0,0 +1,222 @@
+"""Benchmark of the motion engines and shared stages on synthetic clips.
+
+Each engine from :func:`src.cli.make_engine` runs over the same synthetic
+clip (:mod:`src.bench.synthetic`) at every requested resolution; the shared
+stages (display resize, overlays, video writer) are timed on the same frames.
+Per-frame latencies are reported as percentiles, together with FPS and the
+peak traced memory of a separate, shorter pass (``tracemalloc`` slows the
+code it traces, so it never overlaps the timed pass).
+
+The ``flow`` speed presets (:data:`src.pipeline.flow_motion.FLOW_PRESETS`) are
+also timed side by side with their accuracy: the mean mask IoU against the
+``farneback`` preset and the fraction of frames where ``score >=
+--up_threshold`` agrees with the synthetic clip's activity labels.
+
+Usage::
+
+    python -m src.bench.engines --sizes 640x360 1280x720 --frames 300 --json outputs/bench/hoy.json
+    python -m src.bench.engines --baseline outputs/bench/base.json --tolerance 0.15
+
+With ``--baseline`` the run is compared against a saved JSON and the exit
+status is 1 when any p50/p95 latency grew by more than ``--tolerance``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+
+import cv2
+import numpy as np
+
+try:  # sólo Unix
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+from ..cli import ENGINE_PARAMS, build_parser, draw_overlays, make_engine
+from ..io.recorders import make_videowriter
+from ..pipeline.flow_motion import FLOW_PRESETS
+from .synthetic import parse_size, synthetic_frames
+
+ENGINES = tuple(ENGINE_PARAMS)
+
+
+def latency_stats(samples_ns) -> dict:
+    ms = np.asarray(samples_ns, np.float64) / 1e6
+    if not len(ms):
+        return {}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"n": int(len(ms)), "mean_ms": float(ms.mean()), "p50_ms": float(p50),
+            "p95_ms": float(p95), "p99_ms": float(p99), "max_ms": float(ms.max()),
+            "fps": float(1000.0 / ms.mean()) if ms.mean() > 0 else 0.0}
+
+
+def bench_engine(name, frames, args, mem_frames):
+    engine = make_engine(name, args)
+    t = time.perf_counter_ns()
+    engine.initialize(frames[0])
+    init_ms = (time.perf_counter_ns() - t) / 1e6
+    lat = []
+    for f in frames[1:]:
+        t = time.perf_counter_ns()
+        engine.step(f, min_area_pct=args.min_area_pct)
+        lat.append(time.perf_counter_ns() - t)
+
+    engine = make_engine(name, args)
+    tracemalloc.start()
+    engine.initialize(frames[0])
+    for f in frames[1:mem_frames + 1]:
+        engine.step(f, min_area_pct=args.min_area_pct)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"init_ms": init_ms, **latency_stats(lat), "peak_mem_mb": peak / 2**20}
+
+
+def bench_flow_presets(frames, labels, args, presets):
+    """Latencia, IoU de máscara contra ``farneback`` y acierto contra las etiquetas del clip."""
+    presets = ["farneback"] + [p for p in presets if p != "farneback"]
+    original = args.flow_preset
+    out, ref = {}, []
+    try:
+        for preset in presets:
+            args.flow_preset = preset
+            engine = make_engine("flow", args)
+            engine.initialize(frames[0])
+            lat, ious, hits = [], [], 0
+            for i, (f, active) in enumerate(zip(frames[1:], labels[1:])):
+                t = time.perf_counter_ns()
+                score, mask = engine.step(f, min_area_pct=args.min_area_pct)
+                lat.append(time.perf_counter_ns() - t)
+                hits += (score >= args.up_threshold) == active
+                bits = np.packbits(mask > 0)
+                if preset == "farneback":
+                    ref.append(bits)
+                    continue
+                inter = np.unpackbits(bits & ref[i]).sum()
+                union = np.unpackbits(bits | ref[i]).sum()
+                ious.append(inter / union if union else 1.0)
+            out[preset] = {**latency_stats(lat), "iou": float(np.mean(ious)) if ious else 1.0,
+                           "label_acc": hits / float(max(1, len(lat)))}
+    finally:
+        args.flow_preset = original
+    return out
+
+
+def bench_stages(frames, args, display_w):
+    h, w = frames[0].shape[:2]
+    disp = (display_w, int(h * display_w / w))
+    mask = np.zeros((h, w), np.uint8)
+    mask[h // 4:h // 2, w // 4:w // 2] = 255
+    hist = deque(np.linspace(0, 0.02, 60), maxlen=60)
+    res, ovl, wr = [], [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = make_videowriter(os.path.join(tmp, "bench.mp4"), 30.0, disp)
+        for f in frames:
+            t = time.perf_counter_ns()
+            out = cv2.resize(f, disp)
+            res.append(time.perf_counter_ns() - t)
+            t = time.perf_counter_ns()
+            draw_overlays(out, args, "OPERACION", 0.01, list(hist), 30.0, mask)
+            ovl.append(time.perf_counter_ns() - t)
+            t = time.perf_counter_ns()
+            writer.write(out)
+            wr.append(time.perf_counter_ns() - t)
+        writer.release()
+    return {"resize": latency_stats(res), "overlays": latency_stats(ovl), "writer": latency_stats(wr)}
+
+
+def run(sizes, engines, n_frames, mem_frames, display_w, seed=0, flow_presets=()) -> dict:
+    args = build_parser().parse_args([])
+    report = {"meta": {"frames": n_frames, "python": platform.python_version(), "opencv": cv2.__version__,
+                       "numpy": np.__version__, "machine": platform.machine(),
+                       "threads": cv2.getNumThreads(), "date": time.strftime("%Y-%m-%dT%H:%M:%S")},
+              "results": {}}
+    for size in sizes:
+        w, h = parse_size(size)
+        clip = list(synthetic_frames(w, h, n_frames, seed=seed))
+        frames = [f for f, _ in clip]
+        args.width = w
+        section = {}
+        for name in engines:
+            section[name] = bench_engine(name, frames, args, mem_frames)
+            r = section[name]
+            print(f"{size:>10} {name:>9}  init {r['init_ms']:7.2f} ms  p50 {r['p50_ms']:7.2f}  "
+                  f"p95 {r['p95_ms']:7.2f}  p99 {r['p99_ms']:7.2f} ms  {r['fps']:7.1f} fps  "
+                  f"{r['peak_mem_mb']:6.1f} MB")
+        if flow_presets:
+            for preset, r in bench_flow_presets(frames, [a for _, a in clip], args, flow_presets).items():
+                section[f"flow:{preset}"] = r
+                print(f"{size:>10} {'flow:' + preset:>18}  p50 {r['p50_ms']:7.2f}  p95 {r['p95_ms']:7.2f} ms  "
+                      f"{r['fps']:7.1f} fps  IoU {r['iou']:.3f}  acierto {100 * r['label_acc']:5.1f}%")
+        for stage, r in bench_stages(frames, args, display_w).items():
+            section[stage] = r
+            print(f"{size:>10} {stage:>9}  p50 {r['p50_ms']:7.2f}  p95 {r['p95_ms']:7.2f}  "
+                  f"p99 {r['p99_ms']:7.2f} ms  {r['fps']:7.1f} fps")
+        report["results"][size] = section
+    if resource is not None:
+        # ru_maxrss está en KiB en Linux y en bytes en macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["meta"]["peak_rss_mb"] = rss / (2**20 if sys.platform == "darwin" else 2**10)
+    return report
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Entries whose p50/p95 latency grew more than ``tolerance`` over the baseline."""
+    regressions = []
+    for size, section in current["results"].items():
+        for name, r in section.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base:
+                continue
+            for key in ("p50_ms", "p95_ms"):
+                if base.get(key, 0) > 0 and r[key] > base[key] * (1.0 + tolerance):
+                    regressions.append((size, name, key, base[key], r[key]))
+    return regressions
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark de motores y etapas comunes sobre clips sintéticos.")
+    ap.add_argument("--sizes", nargs="+", default=["640x360", "1280x720"], help="Resoluciones ANCHOxALTO")
+    ap.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    ap.add_argument("--flow_presets", nargs="*", choices=FLOW_PRESETS, default=list(FLOW_PRESETS),
+                    help="Presets de flujo a comparar (sin valores = ninguno)")
+    ap.add_argument("--frames", type=int, default=300, help="Frames por clip")
+    ap.add_argument("--mem_frames", type=int, default=30, help="Frames de la pasada de memoria")
+    ap.add_argument("--display_width", type=int, default=960, help="Ancho del frame de overlays/writer")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", default="", help="Guardar el reporte en este JSON")
+    ap.add_argument("--baseline", default="", help="JSON de referencia para detectar regresiones")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="Aumento relativo tolerado (0.15 = 15%%)")
+    args = ap.parse_args(argv)
+
+    report = run(args.sizes, args.engines, args.frames, args.mem_frames, args.display_width, args.seed,
+                 args.flow_presets)
+    if args.json:
+        d = os.path.dirname(args.json)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[OK] Reporte: {args.json}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for size, name, key, old, new in regressions:
+            print(f"[REGRESION] {size} {name} {key}: {old:.2f} -> {new:.2f} ms (+{100.0 * (new / old - 1):.0f}%)")
+        if regressions:
+            return 1
+        print(f"[OK] Sin regresiones respecto a {args.baseline} (tolerancia {100 * args.tolerance:.0f}%).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Micro-benchmark: original overlay helpers vs. the current ones in ``src.utils.draw``.
+
+Usage::
+
+    python -m src.bench.overlays --width 960 --height 540 --repeat 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from ..utils.draw import ScoreRing, draw_mini_mask, draw_small_graph, draw_status_banner, put_text
+
+
+def draw_status_banner_copy(img, status, score, up_thr, down_thr, fps_est):
+    """Reference implementation: blends a full-frame copy to paint a 48 px bar."""
+    h, w = img.shape[:2]
+    bar_h = 48
+    overlay = img.copy()
+    color = (0,170,0) if status == "OPERACION" else (60,60,200)
+    cv2.rectangle(overlay, (0,0), (w, bar_h), color, -1)
+    cv2.addWeighted(overlay, 0.55, img, 0.45, 0, img)
+    put_text(img, f"Estado: {'EN OPERACION' if status=='OPERACION' else 'IDLE'}",
+             (10, 32), 0.8, (255,255,255), 2)
+    put_text(img, f"Score:{score:.3f} Up:{up_thr:.3f} Down:{down_thr:.3f} FPS:{fps_est:.1f}",
+             (10, bar_h+26), 0.6, (255,255,0), 2)
+
+
+def draw_small_graph_lines(img, values, title="score"):
+    """Reference implementation: one ``cv2.line`` per segment from Python."""
+    gh, gw = 64, 240
+    x0, y0 = img.shape[1]-gw-10, 10
+    g = np.zeros((gh, gw, 3), np.uint8)
+    if len(values) > 1:
+        v = np.clip(np.array(values, dtype=np.float32), 0, 1.0)
+        xs = np.linspace(8, gw-8, len(v)).astype(int)
+        ys = (1.0 - v) * (gh-12) + 6
+        pts = np.stack([xs, ys.astype(int)], axis=1)
+        for i in range(1, len(pts)):
+            cv2.line(g, tuple(int(c) for c in pts[i-1]), tuple(int(c) for c in pts[i]), (0,255,0), 2)
+    cv2.rectangle(g, (0,0), (gw-1, gh-1), (100,100,100), 1)
+    put_text(g, title, (6,18), 0.6, (200,200,200), 1)
+    img[y0:y0+gh, x0:x0+gw] = g
+
+
+def draw_mini_mask_alloc(img, mask, bottom_left, scale=0.25):
+    """Reference implementation: new resize and colour buffers every frame."""
+    mini = cv2.resize(mask, (0,0), fx=scale, fy=scale)
+    mini = cv2.cvtColor(mini, cv2.COLOR_GRAY2BGR)
+    hm, wm = mini.shape[:2]
+    x = bottom_left[0]
+    y = bottom_left[1] - hm
+    img[y:y+hm, x:x+wm] = mini
+    put_text(img, "mask", (x+2, y-4), 0.5, (200,200,200), 1)
+
+
+def _time_ms(fn, frame, repeat):
+    img = frame.copy()
+    fn(img)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(img)
+    return (time.perf_counter() - t0) * 1000.0 / repeat
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de los overlays (banner, gráfico, máscara).")
+    ap.add_argument("--width", type=int, default=960)
+    ap.add_argument("--height", type=int, default=540)
+    ap.add_argument("--history", type=int, default=120, help="Muestras del gráfico")
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+    mask = np.where(rng.random((args.height, args.width)) > 0.9, 255, 0).astype(np.uint8)
+    ring = ScoreRing(args.history)
+    for v in rng.random(args.history * 2) * 0.05:
+        ring.append(v)
+    hist = list(ring.values())
+    bl = (10, args.height - 10)
+    cases = [
+        ("banner", lambda im: draw_status_banner_copy(im, "OPERACION", 0.01, 0.008, 0.005, 30.0),
+         lambda im: draw_status_banner(im, "OPERACION", 0.01, 0.008, 0.005, 30.0)),
+        ("graph", lambda im: draw_small_graph_lines(im, hist),
+         lambda im: draw_small_graph(im, ring.values())),
+        ("mask", lambda im: draw_mini_mask_alloc(im, mask, bl),
+         lambda im: draw_mini_mask(im, mask, bl)),
+    ]
+    print(f"{'overlay':>8} {'orig_ms':>9} {'new_ms':>8} {'speedup':>8}")
+    for name, old, new in cases:
+        a, b = frame.copy(), frame.copy()
+        old(a)
+        new(b)
+        if not np.array_equal(a, b):
+            raise AssertionError(f"Resultados distintos en {name}")
+        t_old = _time_ms(old, frame, args.repeat)
+        t_new = _time_ms(new, frame, args.repeat)
+        print(f"{name:>8} {t_old:>9.3f} {t_new:>8.3f} {t_old / max(t_new, 1e-9):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,24 +2,67 @@ import cv2
 import numpy as np
 import argparse
 import os
+import sys
 import time
-from collections import deque
 from datetime import datetime
 from pathlib import Path
 
-from .utils.draw import put_text, draw_status_banner, draw_small_graph, draw_mini_mask
-from .utils.smoothing import moving_avg
+from .utils.draw import (ScoreRing, put_text, draw_status_banner, draw_small_graph, draw_mini_mask,
+                         draw_timing, draw_engine_rows)
+from .utils.smoothing import SMOOTHERS, make_smoother
 from .pipeline.diff_motion import DiffMotion
 from .pipeline.mog2_motion import Mog2Motion
 from .pipeline.knn_motion import KNNMotion
-from .pipeline.flow_motion import FlowMotion
+from .pipeline.flow_motion import FLOW_PRESETS, FlowMotion
+from .pipeline.lk_motion import LKGridMotion
 from .pipeline.avg_motion import AvgMotion
 from .pipeline.edges_motion import EdgesMotion
-from .io.recorders import CSVRecorder, make_videowriter
+from .pipeline.cascade_motion import CascadeMotion
+from .pipeline.ensemble import FUSE_RULES, EngineSet
+from .pipeline.frame_context import FrameContext
+from .pipeline.state_machine import OperationStateMachine
+from .pipeline.postprocess import score_from_mask
+from .io.recorders import AsyncVideoWriter, CSVRecorder
+from .io.metrics import MetricsServer
+from .io.snapshots import camera_key, load_snapshot, save_snapshot, snapshot_path
+from .io.traces import TraceWriter, fingerprint, trace_key, trace_path
+from .utils.camera import FrameReader
+from .utils.clock import make_clock, parse_start_time
+from .utils.heatmap import ActivityGrid, parse_grid
+from .utils.roi import load_roi
+from .utils.scaling import to_analysis
+from .utils.timing import NULL_TIMER, StageTimer, TimingLog
+from .utils.adaptive import AdaptiveRate
 
 def iso(ts=None):
     return (datetime.now() if ts is None else datetime.fromtimestamp(ts)).isoformat(timespec="seconds")
 
+def hms(sec):
+    sec = max(0, int(sec))
+    return f"{sec // 3600:d}:{sec % 3600 // 60:02d}:{sec % 60:02d}"
+
+def effective_skip(args, fps_in):
+    """``--skip`` o, si se pidió ``--analysis_fps``, el salto equivalente según los FPS de la fuente."""
+    if args.analysis_fps and args.analysis_fps > 0 and fps_in and fps_in > 0:
+        return max(1, int(round(fps_in / args.analysis_fps)))
+    return max(1, args.skip)
+
+def draw_overlays(out, args, status, score_s, hist, fps_est, mask, roi=None, timing=None, engines=None):
+    if roi:
+        roi.draw(out)
+        if mask is not None:
+            mask = roi.expand(mask)
+    draw_status_banner(out, status, score_s, args.up_threshold, args.down_threshold, fps_est)
+    draw_small_graph(out, hist, "score")
+    if mask is not None:
+        # la máscara está a resolución de análisis: se escala sólo al dibujarla
+        draw_mini_mask(out, mask, (10, out.shape[0]-10), scale=0.25 * out.shape[1] / mask.shape[1])
+    if timing:
+        draw_timing(out, timing)
+    if engines:
+        draw_engine_rows(out, engines)
+    return out
+
 VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi", ".MP4", ".MOV", ".MKV", ".AVI")
 DEFAULT_VIDEO_DIR = "data/raw_videos"
 
@@ -93,61 +136,225 @@ def pick_source_interactive() -> str | None:
     print("Opción inválida.")
     return None
 
-def make_engine(name, args):
+def step_engine(engine, ctx, args, roi=None):
+    """
+    ``engine.step`` sobre el ``FrameContext`` del frame de análisis, ya recortado
+    a la caja de la ROI si la hay (``roi.crop``); el score se mide sobre la ROI.
+    """
+    if not roi:
+        return engine.step(ctx, min_area_pct=args.min_area_pct)
+    _, mask = engine.step(ctx, min_area_pct=args.min_area_pct)
+    mask = roi.apply(mask)
+    return score_from_mask(mask, args.min_area_pct, roi.area), mask
+
+def make_engine(name, args, scale=1.0):
+    """
+    Construye el motor ``name``. ``scale`` = ancho de análisis / ``--width``: los
+    parámetros en píxeles (área mínima de blob, umbral de flujo) se definen a la
+    resolución de ``--width`` y se ajustan a la de análisis.
+    """
+    min_blob = int(round(args.min_blob_area_px * scale * scale))
     if name == "diff":
         blur = args.blur if (args.blur % 2 == 1) else args.blur + 1
         return DiffMotion(blur=blur, diff_thr=args.diff_thr,
-                          min_blob_area_px=args.min_blob_area_px,
+                          min_blob_area_px=min_blob,
                           morph_kernel=args.morph_kernel)
     if name == "mog2":
         return Mog2Motion(history=args.mog2_history, varThreshold=args.mog2_varT,
                           detectShadows=True, learningRate=args.mog2_lr,
-                          min_blob_area_px=args.min_blob_area_px,
+                          min_blob_area_px=min_blob,
                           morph_kernel=args.morph_kernel)
     if name == "knn":
         return KNNMotion(history=args.knn_history, dist2Threshold=args.knn_dist2T,
                          detectShadows=True, learningRate=args.knn_lr,
-                         min_blob_area_px=args.min_blob_area_px,
+                         min_blob_area_px=min_blob,
                          morph_kernel=args.morph_kernel)
     if name == "flow":
-        return FlowMotion(flow_thr=args.flow_thr,
-                          min_blob_area_px=args.min_blob_area_px,
-                          morph_kernel=args.morph_kernel)
+        return FlowMotion(flow_thr=args.flow_thr * scale,
+                          min_blob_area_px=min_blob,
+                          morph_kernel=args.morph_kernel,
+                          preset=args.flow_preset)
+    if name == "lk":
+        return LKGridMotion(flow_thr=args.flow_thr * scale,
+                            grid_step=int(round(args.lk_step * scale)),
+                            win_size=args.lk_win, max_level=args.lk_levels,
+                            min_eig=args.lk_min_eig)
     if name == "avg":
         return AvgMotion(alpha=args.avg_alpha, thr=args.avg_thr,
-                         min_blob_area_px=args.min_blob_area_px,
+                         min_blob_area_px=min_blob,
                          morph_kernel=args.morph_kernel)
     if name == "edges":
         return EdgesMotion(canny1=args.canny1, canny2=args.canny2,
-                           min_blob_area_px=args.min_blob_area_px,
+                           min_blob_area_px=min_blob,
                            morph_kernel=args.morph_kernel)
+    if name == "cascade":
+        if args.cascade_inner == "cascade":
+            raise ValueError("El motor interno de la cascada no puede ser otra cascada")
+        return CascadeMotion(make_engine(args.cascade_inner, args, scale),
+                             gate_width=args.gate_width, gate_diff_thr=args.gate_diff_thr,
+                             pre_thr=args.gate_pre_thr, refresh_every=args.gate_refresh,
+                             hold_frames=args.gate_hold)
     raise ValueError(f"Engine desconocido: {name}")
 
-def main():
-    ap = argparse.ArgumentParser(
-        description="Monitor de operación con múltiples motores y múltiples intervalos (OPERACION <-> IDLE)."
-    )
-    ap.add_argument(
-        "--src",
-        default="",
-        help="Ruta de video, índice de cámara o directorio de videos. Si se omite, aparece un menú.",
-    )
-    ap.add_argument("--engine", choices=["mog2","diff","knn","flow","avg","edges"], default="mog2",
-                    help="Motor de movimiento.")
+def frame_to_frame(engine):
+    """Motores que comparan contra el frame anterior (diff, edges, flow, lk, cascade): tras
+    una pausa se re-inicializan con el frame actual. Los de modelo de fondo (con ``snapshot``)
+    siguen con su modelo; ``initialize`` lo sesgaría hacia el frame actual."""
+    return isinstance(engine, CascadeMotion) or not hasattr(engine, "snapshot")
+
+def warm_start(engine, args, frame, key, name=None):
+    """
+    Inicializa ``engine`` (``name``, por defecto ``--engine``) desde el snapshot de
+    la cámara ``key`` en ``--state_dir`` si existe y es compatible (mismo motor y
+    tamaño); si no, con ``initialize``. Devuelve la ruta restaurada o ``None``.
+    """
+    if args.state_dir and hasattr(engine, "restore"):
+        name = name or args.engine
+        name = args.cascade_inner if name == "cascade" else name
+        path = snapshot_path(args.state_dir, key, name)
+        snap = load_snapshot(path)
+        if snap is not None and engine.restore(snap[0], frame):
+            return path
+    engine.initialize(frame)
+    return None
+
+def save_engine_state(engine, args, key, src="", name=None):
+    """Guarda el snapshot de ``engine`` para la cámara ``key`` (``None`` si no aplica)."""
+    state = engine.snapshot() if args.state_dir and hasattr(engine, "snapshot") else None
+    if not state:
+        return None
+    name = name or args.engine
+    name = args.cascade_inner if name == "cascade" else name
+    return save_snapshot(snapshot_path(args.state_dir, key, name), state,
+                         {"engine": name, "src": src, "saved": iso()})
+
+# Parámetros que cambian el score crudo de cada motor (clave de las trazas)
+ENGINE_PARAMS = {
+    "diff": ("blur", "diff_thr"),
+    "mog2": ("mog2_history", "mog2_varT", "mog2_lr"),
+    "knn": ("knn_history", "knn_dist2T", "knn_lr"),
+    "flow": ("flow_thr", "flow_preset"),
+    "lk": ("flow_thr", "lk_step", "lk_win", "lk_levels", "lk_min_eig"),
+    "avg": ("avg_alpha", "avg_thr"),
+    "edges": ("canny1", "canny2"),
+    "cascade": ("cascade_inner", "gate_width", "gate_diff_thr", "gate_pre_thr", "gate_refresh", "gate_hold"),
+}
+
+def engine_list(text):
+    """``--engine``: un motor o varios separados por coma, sin repetir (``diff,mog2,flow``)."""
+    names = [n.strip() for n in text.split(",") if n.strip()]
+    bad = [n for n in names if n not in ENGINE_PARAMS]
+    if not names or bad or len(set(names)) != len(names):
+        raise argparse.ArgumentTypeError(
+            f"motor inválido: {text!r} (opciones: {', '.join(ENGINE_PARAMS)}; separados por coma, sin repetir)")
+    return ",".join(names)
+
+def engine_csv_path(csv_path, name):
+    """CSV de un motor cuando se comparan varios: ``operacion.csv`` -> ``operacion_diff.csv``."""
+    root, ext = os.path.splitext(csv_path)
+    return f"{root}_{name}{ext or '.csv'}"
+
+def score_params(args, skip, roi=None):
+    """Todo lo que determina el score crudo por frame (no umbrales ni suavizado)."""
+    params = {k: getattr(args, k) for k in ENGINE_PARAMS.get(args.engine, ())}
+    if args.engine == "cascade":
+        params.update({k: getattr(args, k) for k in ENGINE_PARAMS.get(args.cascade_inner, ())})
+    params.update(engine=args.engine, width=args.width, analysis_width=args.analysis_width,
+                  pyr_levels=args.pyr_levels, skip=skip, min_area_pct=args.min_area_pct,
+                  morph_kernel=args.morph_kernel, min_blob_area_px=args.min_blob_area_px)
+    if args.adaptive:
+        params.update(adaptive=True, adaptive_idle_sec=args.adaptive_idle_sec, adaptive_fps=args.adaptive_fps,
+                      adaptive_width=args.adaptive_width, down_threshold=args.down_threshold,
+                      smoother=args.smoother, smooth_k=args.smooth_k, smooth_sec=args.smooth_sec,
+                      up_threshold=args.up_threshold, min_active_sec=args.min_active_sec,
+                      idle_stop_sec=args.idle_stop_sec)
+    if roi:
+        params["roi"] = {"units": roi.units,
+                         "include": [p.tolist() for p in roi.include],
+                         "exclude": [p.tolist() for p in roi.exclude]}
+    return params
+
+def add_processing_arguments(ap):
+    """Opciones de motor, umbrales y reloj compartidas por ``main`` y los subcomandos."""
+    ap.add_argument("--engine", type=engine_list, default="mog2",
+                    help="Motor de movimiento: mog2, diff, knn, flow, lk, avg, edges o cascade "
+                         "(compuerta barata + --cascade_inner). Varios separados por coma "
+                         "(p. ej. diff,mog2,flow) se comparan sobre la misma decodificación")
+    ap.add_argument("--fuse", choices=FUSE_RULES, default="any",
+                    help="Con varios motores: decisión combinada para el HUD y el CSV principal "
+                         "(any = alguno, all = todos, majority = mayoría)")
+    ap.add_argument("--engine_workers", type=int, default=0,
+                    help="Hilos para correr varios motores en paralelo (0 = uno por motor)")
     # Dimensiones
     ap.add_argument("--width", type=int, default=960, help="Ancho de procesamiento (auto alto)")
-    ap.add_argument("--display_width", type=int, default=960, help="Ancho de ventana OpenCV")
+    ap.add_argument("--analysis_width", type=int, default=0,
+                    help="Ancho para los motores (INTER_AREA); 0 = igual a --width. "
+                         "Overlays y --out se mantienen a --width")
+    ap.add_argument("--roi", action="append", default=[], metavar="'x1,y1;x2,y2;...'",
+                    help="Polígono de inclusión en coordenadas normalizadas (0-1); repetible")
+    ap.add_argument("--exclude", action="append", default=[], metavar="'x1,y1;x2,y2;...'",
+                    help="Polígono de exclusión en coordenadas normalizadas (0-1); repetible")
+    ap.add_argument("--roi_config", default="",
+                    help="JSON con polígonos include/exclude por fuente (ver src/utils/roi.py)")
+    ap.add_argument("--grid", default="", metavar="FILASxCOLUMNAS",
+                    help="Actividad por celda en una rejilla (ej. 8x8) y mapa de calor de la sesión")
+    ap.add_argument("--heatmap", default="",
+                    help="Prefijo de salida del mapa de calor (.npy y .png); por defecto outputs/heatmaps/<fuente>")
+    ap.add_argument("--pyr_levels", type=int, default=0,
+                    help="Niveles extra de pyrDown sobre el frame de análisis (cada uno divide a la mitad)")
     ap.add_argument("--skip", type=int, default=1, help="Procesar cada N frames")
+    ap.add_argument("--analysis_fps", type=float, default=0.0,
+                    help="FPS de análisis deseados; calcula --skip a partir de los FPS de la fuente (0 = usar --skip)")
+    ap.add_argument("--seek_min_skip", type=int, default=50,
+                    help="En archivos, saltos de al menos N frames se hacen con seek en vez de decodificar (0 = nunca)")
+    ap.add_argument("--capture_mode", choices=["auto", "lossless", "latest"], default="auto",
+                    help="Captura en hilo propio: lossless (todos los frames, archivos), "
+                         "latest (frame más reciente, cámaras) o auto según la fuente")
+    ap.add_argument("--queue_size", type=int, default=8,
+                    help="Capacidad de las colas entre captura, análisis y salida")
     # Umbrales generales
     ap.add_argument("--min_area_pct", type=float, default=0.001, help="Frac. mínima de pixeles activos (0-1)")
     ap.add_argument("--smooth_k", type=int, default=8, help="Ventana de media móvil del score")
+    ap.add_argument("--smoother", choices=sorted(SMOOTHERS), default="sma",
+                    help="Filtro del score: media móvil (sma), exponencial (ema), mediana o máximo móvil")
+    ap.add_argument("--smooth_sec", type=float, default=0.0,
+                    help="Ventana del filtro en segundos del reloj en vez de --smooth_k muestras "
+                         "(con --adaptive, 0 = --smooth_k frames a la tasa completa)")
+    ap.add_argument("--adaptive", action="store_true",
+                    help="Baja FPS y resolución de análisis tras --adaptive_idle_sec en IDLE sin actividad")
+    ap.add_argument("--adaptive_idle_sec", type=float, default=30.0,
+                    help="Segundos en IDLE con score < --down_threshold antes de reducir la tasa")
+    ap.add_argument("--adaptive_fps", type=float, default=2.0, help="FPS de análisis en modo reducido")
+    ap.add_argument("--adaptive_width", type=int, default=0,
+                    help="Ancho de análisis en modo reducido (0 = mitad del ancho de análisis)")
     ap.add_argument("--up_threshold", type=float, default=0.008, help="Umbral para entrar en operación")
     ap.add_argument("--down_threshold", type=float, default=0.005, help="Umbral para considerar inactividad")
     ap.add_argument("--min_active_sec", type=float, default=0.5, help="Antirebote para activar operación")
     ap.add_argument("--idle_stop_sec", type=float, default=20.0, help="Segundos estático para cerrar intervalo")
-    ap.add_argument("--out", default="", help="MP4 anotado (opcional)")
     ap.add_argument("--csv", default="outputs/csv/operacion_sesion.csv", help="CSV de intervalos")
+    ap.add_argument("--trace_dir", default="",
+                    help="Guarda la traza (tiempo, score crudo) por frame en este directorio para "
+                         "'python -m src replay' (sólo archivos con reloj media)")
+    ap.add_argument("--state_dir", default="",
+                    help="Snapshots del modelo de fondo por cámara: cada corrida arranca del último "
+                         "(mog2/knn/avg; vacío = siempre en frío)")
+    ap.add_argument("--state_key", default="",
+                    help="Clave de cámara del snapshot (por defecto se deriva de --src sin fecha/hora)")
+    ap.add_argument("--state_sec", type=float, default=300.0,
+                    help="Guardar el snapshot cada N segundos de reloj (0 = sólo al terminar)")
     ap.add_argument("--debug", action="store_true", help="Imprime score/estado periódico")
+    ap.add_argument("--timing", action="store_true",
+                    help="Mide la latencia de cada etapa (p50/p95/p99 en el HUD y en líneas [TIME])")
+    ap.add_argument("--timing_sec", type=float, default=10.0, help="Cada cuántos segundos reportar [TIME]")
+    ap.add_argument("--timing_out", default="",
+                    help="JSON Lines con las latencias por etapa en cada reporte (implica --timing)")
+    ap.add_argument("--metrics_port", type=int, default=-1,
+                    help="Sirve métricas tipo Prometheus en http://HOST:PUERTO/metrics (0 = puerto libre, -1 = no)")
+    ap.add_argument("--metrics_host", default="127.0.0.1", help="Interfaz del endpoint de métricas")
+    ap.add_argument("--clock", choices=["auto", "media", "wall"], default="auto",
+                    help="Reloj de la máquina de estados: media (archivos), wall (cámaras) o auto")
+    ap.add_argument("--start_time", default="",
+                    help="Hora ISO del inicio del video para el reloj media (por defecto: ahora)")
 
     # Afinado MOG2 / KNN / Diff / Flow / Avg / Edges
     ap.add_argument("--mog2_history", type=int, default=600)
@@ -162,6 +369,14 @@ def main():
     ap.add_argument("--diff_thr", type=int, default=18)
 
     ap.add_argument("--flow_thr", type=float, default=0.7, help="Umbral de magnitud de flujo (px/frame)")
+    ap.add_argument("--flow_preset", choices=FLOW_PRESETS, default="farneback",
+                    help="Velocidad de --engine flow: farneback, warm (inicia desde el flujo anterior), "
+                         "half (a media resolución) o DIS (dis_ultrafast/dis_fast/dis_medium)")
+    ap.add_argument("--lk_step", type=int, default=16, help="Separación (px) de la rejilla de puntos de --engine lk")
+    ap.add_argument("--lk_win", type=int, default=15, help="Ventana de Lucas-Kanade (px)")
+    ap.add_argument("--lk_levels", type=int, default=2, help="Niveles de pirámide de Lucas-Kanade")
+    ap.add_argument("--lk_min_eig", type=float, default=1e-3,
+                    help="Autovalor mínimo para rastrear un punto (descarta zonas sin textura)")
 
     ap.add_argument("--avg_alpha", type=float, default=0.02, help="Factor de aprendizaje promedio exponencial")
     ap.add_argument("--avg_thr", type=int, default=18)
@@ -169,10 +384,61 @@ def main():
     ap.add_argument("--canny1", type=int, default=60)
     ap.add_argument("--canny2", type=int, default=120)
 
+    ap.add_argument("--cascade_inner", choices=["mog2","diff","knn","flow","lk","avg","edges"], default="flow",
+                    help="Motor costoso detrás de la compuerta de --engine cascade")
+    ap.add_argument("--gate_width", type=int, default=160, help="Ancho (px) del frame de la compuerta")
+    ap.add_argument("--gate_diff_thr", type=int, default=12, help="Umbral de diferencia de la compuerta")
+    ap.add_argument("--gate_pre_thr", type=float, default=0.002,
+                    help="Fracción de pixeles cambiados que dispara el motor interno")
+    ap.add_argument("--gate_refresh", type=int, default=30,
+                    help="Ejecutar el motor interno al menos cada N frames (0 = nunca)")
+    ap.add_argument("--gate_hold", type=int, default=15,
+                    help="Frames que el motor interno sigue activo tras superar la compuerta")
+
     ap.add_argument("--morph_kernel", type=int, default=3, help="Kernel morfológico (3/5)")
     ap.add_argument("--min_blob_area_px", type=int, default=80, help="Descartar blobs pequeños (px)")
+    return ap
 
-    args = ap.parse_args()
+def build_parser():
+    ap = argparse.ArgumentParser(
+        description="Monitor de operación con múltiples motores y múltiples intervalos (OPERACION <-> IDLE).",
+        epilog="Subcomandos: 'batch' procesa un directorio completo en paralelo, 'multi' "
+               "monitorea varias cámaras en un solo proceso, 'replay' recalcula intervalos "
+               "desde trazas guardadas y 'tune' busca umbrales contra intervalos etiquetados (python -m src <subcomando> --help).",
+    )
+    ap.add_argument(
+        "--src",
+        default="",
+        help="Ruta de video, índice de cámara o directorio de videos. Si se omite, aparece un menú.",
+    )
+    ap.add_argument("--display_width", type=int, default=960, help="Ancho de ventana OpenCV")
+    ap.add_argument("--display_fps", type=float, default=30.0,
+                    help="Refresco máximo de la ventana; los overlays sólo se dibujan a este ritmo "
+                         "(--out siempre los dibuja en cada frame). 0 = cada frame")
+    ap.add_argument("--out", default="", help="MP4 anotado (opcional)")
+    ap.add_argument("--out_policy", choices=["auto", *AsyncVideoWriter.POLICIES], default="auto",
+                    help="Con la cola de escritura llena: block, drop_oldest o raw (sin overlays). "
+                         "auto = block en archivos, drop_oldest en cámaras")
+    ap.add_argument("--out_queue", type=int, default=32, help="Frames pendientes máximos del writer")
+    ap.add_argument("--headless", action="store_true",
+                    help="Sin ventana ni overlays (salvo --out); procesa tan rápido como permita la CPU")
+    ap.add_argument("--progress_sec", type=float, default=5.0,
+                    help="Cada cuántos segundos reportar avance/ETA en modo --headless")
+    return add_processing_arguments(ap)
+
+def _subcommands():
+    from . import batch, multicam, replay, tune
+    return {"batch": batch.main, "multi": multicam.main, "replay": replay.main, "tune": tune.main}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and not argv[0].startswith("-"):
+        sub = _subcommands().get(argv[0])
+        if sub is None:
+            raise SystemExit(f"Subcomando desconocido: {argv[0]}")
+        return sub(argv[1:])
+
+    args = build_parser().parse_args(argv)
 
     # Menú si no se especificó --src
     if not args.src:
@@ -189,6 +455,15 @@ def main():
             return
         args.src = chosen
 
+    run_monitor(args)
+
+def run_monitor(args, on_interval=None, verbose=True):
+    """
+    Procesa una fuente completa con el motor y la histéresis de ``args``.
+
+    ``on_interval(src, inicio, fin)`` recibe cada intervalo cerrado; por defecto
+    se agregan al CSV de ``args.csv``. Devuelve un resumen con frames e intervalos.
+    """
     # Fuente
     source = int(args.src) if args.src.isdigit() else args.src
     cap = cv2.VideoCapture(source)
@@ -202,114 +477,368 @@ def main():
     proc_w = args.width if orig_w > 0 else 960
     proc_h = int(orig_h * scale) if orig_h > 0 else 540
 
-    writer = make_videowriter(args.out, fps_in, (proc_w, proc_h)) if args.out else None
-
-    # Motor
-    engine = make_engine(args.engine, args)
-
     # Primer frame / init
     ret, frame0 = cap.read()
     if not ret:
         raise RuntimeError("No pude leer el primer frame.")
-    frame0 = cv2.resize(frame0, (proc_w, proc_h))
-    engine.initialize(frame0)
+    ana_w = args.analysis_width if args.analysis_width > 0 else proc_w
+    ana0 = to_analysis(frame0, ana_w, args.pyr_levels)
+
+    roi = load_roi(args.src, args.roi_config, args.roi, args.exclude)
+    if roi:
+        roi.bind(ana0.shape[1], ana0.shape[0], frame0.shape[1], frame0.shape[0])
+
+    grid = None
+    if args.grid:
+        grid = ActivityGrid(*parse_grid(args.grid)).bind(ana0.shape[0], ana0.shape[1], background=ana0)
+
+    # Motor(es) (a resolución de análisis, sólo sobre la caja de la ROI)
+    names = args.engine.split(",")
+    if len(names) > 1 and args.adaptive:
+        raise ValueError("--adaptive funciona con un solo --engine")
+    engines = [make_engine(n, args, scale=ana0.shape[1] / float(proc_w)) for n in names]
+    engine = engines[0]
+    state_key = args.state_key or camera_key(args.src)
+    restored = [warm_start(e, args, roi.crop(ana0) if roi else ana0, state_key, n)
+                for e, n in zip(engines, names)]
+    if verbose:
+        for path in filter(None, restored):
+            print(f"[OK] Modelo de fondo restaurado: {path}")
+    clock = make_clock(source, fps_in, args.clock, parse_start_time(args.start_time))
+    t0 = clock.stamp(cap, 0)
+
+    capture_mode = args.capture_mode
+    if capture_mode == "auto":
+        capture_mode = "lossless" if clock.kind == "media" else "latest"
+    skip = effective_skip(args, fps_in)
+
+    # Tasa adaptativa: un segundo motor a menor resolución para los tramos IDLE largos
+    adaptive = None
+    smooth_sec = args.smooth_sec
+    if args.adaptive:
+        # múltiplo de --skip: los frames del modo reducido son un subconjunto de los de tasa completa
+        idle_skip = skip * max(1, int(round(fps_in / args.adaptive_fps / skip))) \
+            if fps_in > 0 and args.adaptive_fps > 0 else skip
+        adaptive = AdaptiveRate(skip, idle_skip, args.adaptive_idle_sec, args.down_threshold)
+        idle_w = args.adaptive_width if args.adaptive_width > 0 else max(16, ana0.shape[1] // 2)
+        ana_idle0 = to_analysis(frame0, idle_w, args.pyr_levels)
+        roi_idle = load_roi(args.src, args.roi_config, args.roi, args.exclude)
+        if roi_idle:
+            roi_idle.bind(ana_idle0.shape[1], ana_idle0.shape[0], frame0.shape[1], frame0.shape[0])
+        idle_engine = make_engine(args.engine, args, scale=ana_idle0.shape[1] / float(proc_w))
+        idle_engine.initialize(roi_idle.crop(ana_idle0) if roi_idle else ana_idle0)
+        if smooth_sec <= 0:
+            # la ventana debe medirse en segundos para no depender de la tasa
+            smooth_sec = args.smooth_k * skip / (fps_in if fps_in > 0 else 30.0)
+    # En archivos el lector sigue a tasa completa y el modo reducido descarta frames en el
+    # ciclo: cambiar ``reader.skip`` afectaría a los frames que el hilo ya leyó por adelantado
+    # y el resultado dependería del ritmo de los hilos. En vivo sí se cambia ``reader.skip``.
+    idle_in_loop = adaptive is not None and capture_mode == "lossless"
+    reader = FrameReader(cap, maxlen=args.queue_size if capture_mode == "lossless" else 1,
+                         clock=clock, mode=capture_mode, skip=skip,
+                         seek_min_skip=args.seek_min_skip if clock.kind == "media" else 0)
+
+    # Traza por frame: sólo tiene sentido si se analizan todos los frames en tiempo media
+    # (y desde un modelo en frío: la clave de la traza no incluye el snapshot)
+    trace = None
+    if args.trace_dir and clock.kind == "media" and capture_mode == "lossless" and not any(restored) \
+            and len(engines) == 1:
+        trace = TraceWriter()
+
+    # Latencias por etapa (opcional; el endpoint de métricas también las publica)
+    base = "cam_" + args.src if args.src.isdigit() else os.path.splitext(os.path.basename(args.src))[0]
+    show_timing = args.timing or bool(args.timing_out)
+    timer = StageTimer() if (show_timing or args.metrics_port >= 0) else NULL_TIMER
+    timing_log = TimingLog(args.timing_out, args.src) if args.timing_out else None
+    timing = None
+    metrics_server = metrics = None
+    if args.metrics_port >= 0:
+        metrics_server = MetricsServer(args.metrics_port, args.metrics_host).start()
+        metrics = metrics_server.register(base, timer)
+        if verbose:
+            print(f"[OK] Métricas en http://{metrics_server.host}:{metrics_server.port}/metrics")
+
+    # Salida: overlays y codificación en un hilo aparte
+    writer = None
+    if args.out:
+        out_policy = args.out_policy
+        if out_policy == "auto":
+            out_policy = "block" if clock.kind == "media" else "drop_oldest"
+        # con --skip el video anotado conserva la duración real
+        fps_out = fps_in / skip if fps_in and fps_in > 0 else 0.0
+        writer = AsyncVideoWriter(args.out, fps_out, (proc_w, proc_h), maxsize=args.out_queue,
+                                  policy=out_policy,
+                                  render=lambda out, overlay: draw_overlays(out, args, *overlay),
+                                  timer=timer if timer.enabled else None)
 
     # Ventana
-    cv2.namedWindow("monitor", cv2.WINDOW_NORMAL)
-    disp_h = int(proc_h * (args.display_width / proc_w))
-    cv2.resizeWindow("monitor", args.display_width, disp_h)
-
-    # Estado con múltiples intervalos
-    status = "IDLE"                 # "IDLE" | "OPERACION"
-    score_hist = deque(maxlen=max(10, args.smooth_k))
-    last_state_ts = time.time()
+    if not args.headless:
+        cv2.namedWindow("monitor", cv2.WINDOW_NORMAL)
+        disp_h = int(proc_h * (args.display_width / proc_w))
+        cv2.resizeWindow("monitor", args.display_width, disp_h)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    need_display = (not args.headless) or (writer is not None)
+
+    # Estado con múltiples intervalos (tiempos del reloj media/pared)
+    fsm = OperationStateMachine(args.up_threshold, args.down_threshold,
+                                args.min_active_sec, args.idle_stop_sec, start_ts=t0)
+    score_hist = ScoreRing(max(10, args.smooth_k))
+    smoother = make_smoother(args.smoother, args.smooth_k, smooth_sec)
+
+    # Varios motores: suavizado, histéresis y CSV propios; ``fsm`` sigue la decisión combinada
+    ensemble = engine_csvs = None
+    if len(engines) > 1:
+        ensemble = EngineSet(names, engines,
+                             [make_smoother(args.smoother, args.smooth_k, smooth_sec) for _ in names],
+                             [OperationStateMachine(args.up_threshold, args.down_threshold, args.min_active_sec,
+                                                    args.idle_stop_sec, start_ts=t0) for _ in names],
+                             fuse=args.fuse, workers=args.engine_workers)
+        engine_csvs = [CSVRecorder(engine_csv_path(args.csv, n)) if args.csv else None for n in names]
+    rows = None
     fps_est, frames_cnt, t_fps = 0.0, 0, time.time()
-
-    # Intervalos: lista de tuplas (inicio, fin)
-    current_start = None
-    csv_rec = CSVRecorder(args.csv) if args.csv else None
-
-    print("[OK] Monitor iniciado. ESC para salir.")
+    ts = t0
+
+    if on_interval is None:
+        csv_rec = CSVRecorder(args.csv) if args.csv else None
+        on_interval = csv_rec.append_interval if csv_rec else None
+    n_intervals = 0
+
+    if verbose and args.headless:
+        print(f"[OK] Monitor iniciado (headless). Frames totales: {total_frames or 'desconocido'}, "
+              f"analizando 1 de cada {skip} a {ana0.shape[1]}x{ana0.shape[0]}"
+              + (f", ROI {100.0 * roi.area / (ana0.shape[0] * ana0.shape[1]):.0f}% del frame." if roi else "."))
+    elif verbose:
+        print("[OK] Monitor iniciado. ESC para salir.")
     frame_idx = 0
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        if frame_idx % args.skip != 0:
-            frame_idx += 1
-            continue
-
-        frame = cv2.resize(frame, (proc_w, proc_h))
-        score, mask = engine.step(frame, min_area_pct=args.min_area_pct)
-
-        score_hist.append(score)
-        score_s = moving_avg(score_hist, args.smooth_k)
-
-        now = time.time()
-        frames_cnt += 1
-        if now - t_fps >= 0.5:
-            fps_est = frames_cnt / (now - t_fps)
-            frames_cnt = 0
-            t_fps = now
-
-        if args.debug and frame_idx % 15 == 0:
-            print(f"[DBG] score_s={score_s:.5f}  state={status}")
-
-        # ---- Lógica con múltiples intervalos ----
-        if status == "IDLE":
-            if score_s >= args.up_threshold:
-                # Debe sostenerse por min_active_sec
-                if (now - last_state_ts) >= args.min_active_sec:
-                    status = "OPERACION"
-                    last_state_ts = now
-                    current_start = now
+    last_seq = 0
+    finished = False
+    t_run = time.time()
+    t_prog = t_time = t_run
+    t_disp = 0.0
+    t_state = t0
+    display_fps = getattr(args, "display_fps", 0.0)  # batch/replay no tienen ventana
+    disp_period = 1.0 / display_fps if display_fps > 0 else 0.0
+    reader.start()
+
+    try:
+        while True:
+            timer.mark()
+            item = reader.read()
+            timer.lap("read")
+            if item is None:  # fin de la fuente
+                finished = True
+                break
+            seq, ts, frame = item
+            if idle_in_loop and adaptive.mode == "idle" and (seq - 1) % adaptive.idle_skip:
+                continue
+            frame_idx = seq - 1  # frame0 ya se consumió
+            gap, last_seq = seq - last_seq, seq
+
+            src_frame = frame
+            idle_rate = adaptive is not None and adaptive.mode == "idle"
+            if idle_rate:
+                ana = to_analysis(frame, idle_w, args.pyr_levels)
+                timer.lap("ana_resize")
+                score, mask = step_engine(idle_engine, FrameContext(roi_idle.crop(ana) if roi_idle else ana),
+                                          args, roi_idle)
+                cur_roi = roi_idle
+            else:
+                ana = to_analysis(frame, ana_w, args.pyr_levels)
+                timer.lap("ana_resize")
+                # gris, blur, pirámide... se calculan una vez por frame para todos los motores
+                ctx = FrameContext(roi.crop(ana) if roi else ana)
+                if ensemble is not None:
+                    score, mask = ensemble.step(lambda e: step_engine(e, ctx, args, roi))
+                else:
+                    score, mask = step_engine(engine, ctx, args, roi)
+                cur_roi = roi
+            timer.lap("engine")
+            if trace is not None:
+                trace.append(ts - clock.origin, score)
+            # la máscara del motor reducido no tiene el tamaño de la rejilla
+            if grid is not None and mask is not None and not idle_rate:
+                grid.update(roi.expand(mask) if roi else mask)
+                timer.lap("grid")
+            # la ventana se refresca a --display_fps; el writer necesita todos los frames
+            now = time.time()
+            show = not args.headless and now - t_disp >= disp_period
+            if show or writer is not None:
+                frame = cv2.resize(frame, (proc_w, proc_h))
+                timer.lap("resize")
+
+            score_hist.append(score)
+            if ensemble is not None:
+                score_s, closed = ensemble.update(ts)
+                for i, (start_ts, end_ts) in closed:
+                    if engine_csvs[i]:
+                        engine_csvs[i].append_interval(args.src, start_ts, end_ts)
                     if args.debug:
-                        print(f"[STATE] -> OPERACION @ {iso(current_start)}")
+                        print(f"[DBG] {names[i]}: {iso(start_ts)} -> {iso(end_ts)}  ({end_ts-start_ts:.1f}s)")
+                rows = ensemble.rows() if need_display else None
             else:
-                # sigue en IDLE, refrescamos el temporizador
-                last_state_ts = now
-        else:  # OPERACION
-            if score_s <= args.down_threshold:
-                # Debe sostenerse inactivo por idle_stop_sec
-                if (now - last_state_ts) >= args.idle_stop_sec:
-                    end_ts = now
-                    if csv_rec and current_start is not None:
-                        csv_rec.append_interval(args.src, current_start, end_ts)
-                        print(f"[OK] Intervalo: {iso(current_start)} -> {iso(end_ts)}  ({end_ts-current_start:.1f}s)")
-                    status = "IDLE"
-                    last_state_ts = now
-                    current_start = None
+                score_s = smoother.update(score, ts)
+
+            frames_cnt += 1
+            if now - t_fps >= 0.5:
+                fps_est = frames_cnt / (now - t_fps)
+                frames_cnt = 0
+                t_fps = now
+                if show_timing and need_display:
+                    timing = timer.stats()
+            if show_timing and now - t_time >= args.timing_sec:
+                t_time = now
+                stats = timer.stats()
+                if verbose:
+                    print(f"[TIME] p50/p95/p99 ms  {timer.log_line(stats)}")
+                if timing_log is not None:
+                    timing_log.write(stats, seq)
+
+            if args.debug and frame_idx % 15 == 0:
+                wq = f"  out_q={writer.queued} out_drop={writer.dropped}" if writer is not None else ""
+                gate = f"  gate={engine.gate_score:.4f} skip={100.0 * engine.skip_rate:.0f}%" \
+                    if isinstance(engine, CascadeMotion) else ""
+                print(f"[DBG] score_s={score_s:.5f}  state={fsm.status}{wq}{gate}")
+
+            # ---- Lógica con múltiples intervalos ----
+            if idle_rate:
+                # a tasa reducida el score sólo despierta la tasa completa: IDLE -> OPERACION
+                # (y su min_active_sec) se decide con frames a tasa completa desde el despertar
+                interval = None
+                fsm.last_state_ts = ts
             else:
-                # sigue en operacion, refrescar temporizador para idle
-                last_state_ts = now
-        # ----------------------------------------
-
-        out = frame.copy()
-        draw_status_banner(out, status, score_s, args.up_threshold, args.down_threshold, fps_est)
-        draw_small_graph(out, list(score_hist), "score")
-        if mask is not None:
-            draw_mini_mask(out, mask, (10, out.shape[0]-10))
-
-        cv2.imshow("monitor", out)
+                interval = fsm.update(score_s, ts)
+            if interval is not None:
+                start_ts, end_ts = interval
+                n_intervals += 1
+                if on_interval:
+                    on_interval(args.src, start_ts, end_ts)
+                if verbose:
+                    print(f"[OK] Intervalo: {iso(start_ts)} -> {iso(end_ts)}  ({end_ts-start_ts:.1f}s)")
+            elif args.debug and fsm.status == "OPERACION" and fsm.current_start == ts:
+                print(f"[STATE] -> OPERACION @ {iso(ts)}")
+            status = fsm.status
+            if adaptive is not None and adaptive.update(status, score, score_s, ts):
+                # el motor que retoma se resincroniza con el frame actual
+                if not idle_in_loop:
+                    reader.skip = adaptive.skip
+                target, w, r = (idle_engine, idle_w, roi_idle) if adaptive.mode == "idle" else (engine, ana_w, roi)
+                if frame_to_frame(target):
+                    a = to_analysis(src_frame, w, args.pyr_levels)
+                    target.initialize(r.crop(a) if r else a)
+                if args.debug:
+                    print(f"[RATE] -> {adaptive.mode} (1 de cada {adaptive.skip}) @ {iso(ts)}")
+            if args.state_dir and args.state_sec > 0 and ts - t_state >= args.state_sec:
+                t_state = ts
+                for e, n in zip(engines, names):
+                    save_engine_state(e, args, state_key, args.src, n)
+            timer.lap("fsm")
+            if metrics is not None:
+                metrics.dropped += max(0, gap - (adaptive.skip if adaptive is not None else reader.skip))
+                metrics.frames += 1
+                metrics.fps = fps_est
+                metrics.score = score_s
+                metrics.set_state(status)
+                metrics.intervals = n_intervals
+                if writer is not None:
+                    metrics.out_dropped = writer.dropped
+            # ----------------------------------------
+
+            hist = score_hist.values() if (show or writer is not None) else None
+            if writer is not None:
+                # el frame redimensionado no se reutiliza: el hilo de escritura dibuja encima
+                writer.write(frame, (status, score_s, hist, fps_est, mask, cur_roi, timing, rows))
+                if adaptive is not None:
+                    # en modo reducido se repite el frame para conservar la duración del video
+                    for _ in range(gap // skip - 1):
+                        writer.write(frame.copy(), (status, score_s, hist, fps_est, mask, cur_roi, timing, rows))
+                timer.lap("writer")
+            if show:
+                t_disp = now
+                out = draw_overlays(frame.copy() if writer is not None else frame,
+                                    args, status, score_s, hist, fps_est, mask, cur_roi, timing, rows)
+                timer.lap("draw")
+                cv2.imshow("monitor", out)
+                k = cv2.waitKey(1) & 0xFF
+                timer.lap("imshow")
+                if k == 27:
+                    break
+            elif args.headless and verbose and now - t_prog >= args.progress_sec:
+                t_prog = now
+                done = seq
+                rate = done / max(1e-6, now - t_run)
+                if total_frames > 0:
+                    eta = (total_frames - done) / max(1e-6, rate)
+                    print(f"[PROG] {done}/{total_frames} ({100.0*done/total_frames:.1f}%)  "
+                          f"{rate:.1f} fps  ETA {hms(eta)}")
+                else:
+                    print(f"[PROG] {done} frames  {rate:.1f} fps")
+    finally:
+        # también con excepciones o Ctrl+C: hilos de lectura/escritura, ventana y endpoint
+        reader.stop()
+        cap.release()
+        if ensemble is not None:
+            ensemble.shutdown()
         if writer is not None:
-            writer.write(out)
-
-        k = cv2.waitKey(1) & 0xFF
-        if k == 27:
-            break
-
-        frame_idx += 1
+            writer.release()
+        if metrics_server is not None:
+            metrics_server.stop()
+        if not args.headless:
+            cv2.destroyAllWindows()
 
     # Cierre si quedó activo
-    if status == "OPERACION" and current_start is not None:
-        end_ts = time.time()
-        if csv_rec:
-            csv_rec.append_interval(args.src, current_start, end_ts)
-        print(f"[OK] Intervalo al cierre: {iso(current_start)} -> {iso(end_ts)}  ({end_ts-current_start:.1f}s)")
-
-    cap.release()
-    if writer is not None:
-        writer.release()
-    cv2.destroyAllWindows()
-    print("[OK] Finalizado.")
+    interval = fsm.close(ts)
+    if interval is not None:
+        start_ts, end_ts = interval
+        n_intervals += 1
+        if on_interval:
+            on_interval(args.src, start_ts, end_ts)
+        if verbose:
+            print(f"[OK] Intervalo al cierre: {iso(start_ts)} -> {iso(end_ts)}  ({end_ts-start_ts:.1f}s)")
+    if ensemble is not None:
+        for i, (start_ts, end_ts) in ensemble.close(ts):
+            if engine_csvs[i]:
+                engine_csvs[i].append_interval(args.src, start_ts, end_ts)
+        if verbose:
+            for i, n in enumerate(names):
+                print(f"[OK] Motor {n}: {ensemble.intervals[i]} intervalos, {ensemble.active_sec[i]:.1f}s en operación"
+                      + (f" -> {engine_csvs[i].csv_path}" if engine_csvs[i] else ""))
+            print(f"[OK] Decisión combinada ({args.fuse}): {n_intervals} intervalos.")
+
+    for e, n in zip(engines, names):
+        state_path = save_engine_state(e, args, state_key, args.src, n)
+        if verbose and state_path:
+            print(f"[OK] Snapshot del modelo de fondo: {state_path}")
+    if writer is not None and verbose:
+        st = writer.stats()
+        print(f"[OK] Video anotado: {st['written']} frames escritos, {st['dropped']} descartados, "
+              f"{st['raw']} sin overlay (cola máx. {st['max_queued']}).")
+    if trace is not None and finished and len(trace):
+        key = trace_key(fingerprint(args.src), score_params(args, skip, roi))
+        path = trace.save(trace_path(args.trace_dir, args.src, key),
+                          {"src": args.src, "key": key, "t0": t0 - clock.origin, "fps": fps_in})
+        if verbose:
+            print(f"[OK] Traza de score: {path} ({len(trace)} frames)")
+    if verbose and isinstance(engine, CascadeMotion) and engine.frames:
+        print(f"[OK] Cascada: motor {args.cascade_inner} omitido en {engine.skipped}/{engine.frames} "
+              f"frames ({100.0 * engine.skip_rate:.1f}%), {engine.duplicates} duplicados.")
+    if verbose and adaptive is not None:
+        n_full, n_idle = adaptive.frames["full"], adaptive.frames["idle"]
+        print(f"[OK] Tasa adaptativa: {n_full} frames a tasa completa, {n_idle} en modo reducido "
+              f"(1 de cada {adaptive.idle_skip} a {idle_w}px), {adaptive.switches} cambios.")
+    if show_timing:
+        stats = timer.stats()
+        if verbose:
+            print(f"[TIME] p50/p95/p99 ms  {timer.log_line(stats)}")
+        if timing_log is not None:
+            timing_log.write(stats, reader.seq)
+    if grid is not None and grid.frames:
+        npy_path, png_path = grid.save(args.heatmap or os.path.join("outputs", "heatmaps", base))
+        if verbose:
+            print(f"[OK] Mapa de calor: {png_path} / {npy_path}")
+    frame_idx = reader.seq
+    elapsed = time.time() - t_run
+    if args.headless and verbose:
+        print(f"[OK] {frame_idx} frames en {hms(elapsed)} ({frame_idx / max(1e-6, elapsed):.1f} fps)")
+    if verbose:
+        print("[OK] Finalizado.")
+    return {"src": args.src, "frames": frame_idx, "intervals": n_intervals, "elapsed": elapsed}
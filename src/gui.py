@@ -18,14 +18,14 @@ class App(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Monitor | Selección de fuente")
-        self.geometry("520x560")  # ventana “normal”
+        self.geometry("520x650")  # ventana “normal”
         self.resizable(False, False)
 
         # Estado
         self.source_mode = tk.StringVar(value="camera")  # 'camera' | 'video'
         self.camera_index = tk.StringVar(value="0")
-        # Ahora con 6 motores
-        self.engine = tk.StringVar(value="mog2")         # 'mog2'|'diff'|'knn'|'flow'|'avg'|'edges'
+        # Ahora con 8 motores
+        self.engine = tk.StringVar(value="mog2")         # 'mog2'|'diff'|'knn'|'flow'|'lk'|'avg'|'edges'|'cascade'
         self.idle_stop = tk.StringVar(value="20")
         self.width = tk.StringVar(value="960")           # procesamiento
         self.display_width = tk.StringVar(value="960")   # ventana OpenCV
@@ -34,6 +34,13 @@ class App(tk.Tk):
         self.min_area = tk.StringVar(value="0.001")
         self.smooth_k = tk.StringVar(value="8")
         self.skip = tk.StringVar(value="1")
+        # Cascada (sólo con motor 'cascade')
+        self.cascade_inner = tk.StringVar(value="flow")
+        self.gate_width = tk.StringVar(value="160")
+        self.gate_diff_thr = tk.StringVar(value="12")
+        self.gate_pre_thr = tk.StringVar(value="0.002")
+        self.gate_refresh = tk.StringVar(value="30")
+        self.gate_hold = tk.StringVar(value="15")
         self.out_video = tk.BooleanVar(value=True)
         self.debug = tk.BooleanVar(value=False)
         self.video_dir = tk.StringVar(value=DEFAULT_VIDEO_DIR)
@@ -96,7 +103,7 @@ class App(tk.Tk):
         ttk.Label(frm_params, text="Motor:").grid(row=row, column=0, sticky="e")
         ttk.Combobox(
             frm_params,
-            values=["mog2","diff","knn","flow","avg","edges"],
+            values=["mog2","diff","knn","flow","lk","avg","edges","cascade"],
             textvariable=self.engine,
             width=10,
             state="readonly"
@@ -132,6 +139,35 @@ class App(tk.Tk):
         ttk.Checkbutton(frm_params, text="Debug (imprime score)", variable=self.debug).grid(row=row, column=0, columnspan=4, sticky="w")
         row += 1
 
+        # Cascada: compuerta barata delante del motor costoso
+        frm_cascade = ttk.LabelFrame(self, text="Cascada (motor 'cascade')")
+        frm_cascade.pack(fill="x", **pad)
+
+        row = 0
+        ttk.Label(frm_cascade, text="Motor interno:").grid(row=row, column=0, sticky="e")
+        ttk.Combobox(
+            frm_cascade,
+            values=["mog2","diff","knn","flow","lk","avg","edges"],
+            textvariable=self.cascade_inner,
+            width=10,
+            state="readonly"
+        ).grid(row=row, column=1, sticky="w")
+        ttk.Label(frm_cascade, text="gate_width:").grid(row=row, column=2, sticky="e")
+        ttk.Entry(frm_cascade, width=6, textvariable=self.gate_width).grid(row=row, column=3, sticky="w")
+        row += 1
+
+        ttk.Label(frm_cascade, text="gate_diff_thr:").grid(row=row, column=0, sticky="e")
+        ttk.Entry(frm_cascade, width=6, textvariable=self.gate_diff_thr).grid(row=row, column=1, sticky="w")
+        ttk.Label(frm_cascade, text="gate_pre_thr:").grid(row=row, column=2, sticky="e")
+        ttk.Entry(frm_cascade, width=6, textvariable=self.gate_pre_thr).grid(row=row, column=3, sticky="w")
+        row += 1
+
+        ttk.Label(frm_cascade, text="gate_refresh:").grid(row=row, column=0, sticky="e")
+        ttk.Entry(frm_cascade, width=6, textvariable=self.gate_refresh).grid(row=row, column=1, sticky="w")
+        ttk.Label(frm_cascade, text="gate_hold:").grid(row=row, column=2, sticky="e")
+        ttk.Entry(frm_cascade, width=6, textvariable=self.gate_hold).grid(row=row, column=3, sticky="w")
+        row += 1
+
         # Acciones
         frm_actions = ttk.Frame(self)
         frm_actions.pack(fill="x", **pad)
@@ -265,6 +301,16 @@ class App(tk.Tk):
             "--csv", os.path.join("outputs", "csv", "operacion_sesion.csv"),
         ] + out_arg
 
+        if engine == "cascade":
+            cmd += [
+                "--cascade_inner", self.cascade_inner.get(),
+                "--gate_width", self.gate_width.get(),
+                "--gate_diff_thr", self.gate_diff_thr.get(),
+                "--gate_pre_thr", self.gate_pre_thr.get(),
+                "--gate_refresh", self.gate_refresh.get(),
+                "--gate_hold", self.gate_hold.get(),
+            ]
+
         if debug:
             cmd.append("--debug")
 
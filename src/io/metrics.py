@@ -0,0 +1,142 @@
+"""Prometheus-style text metrics served over HTTP from a background thread.
+
+The frame loop owns one :class:`SourceMetrics` per source and only assigns
+plain attributes on it (atomic under the GIL), so publishing never takes a
+lock.  A scrape reads those attributes and, if the source has a
+:class:`~src.utils.timing.StageTimer`, computes its stage percentiles on the
+spot; the loop is never blocked by a slow client.
+
+    server = MetricsServer(port=0).start()      # 0 = puerto libre (pruebas)
+    m = server.register("cam_0", timer)
+    ...
+    m.frames += 1; m.score = score_s; m.set_state("OPERACION")
+
+``GET /metrics`` returns the text exposition format (version 0.0.4).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+STATES = ("IDLE", "OPERACION")
+
+
+class SourceMetrics:
+    """Counters and gauges of one source, written by its frame loop."""
+
+    def __init__(self, name: str, timer=None) -> None:
+        self.name = name
+        self.timer = timer
+        self.frames = 0
+        self.dropped = 0
+        self.out_dropped = 0
+        self.fps = 0.0
+        self.score = 0.0
+        self.state = "IDLE"
+        self.state_since = time.time()
+        self.intervals = 0
+
+    def set_state(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            self.state_since = time.time()
+
+
+def _esc(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics(sources) -> str:
+    """Text exposition of every source (one ``# TYPE`` block per metric)."""
+    now = time.time()
+    rows = {
+        "monitor_frames_processed_total": ("counter", "Frames analizados", []),
+        "monitor_frames_dropped_total": ("counter", "Frames de captura descartados sin analizar", []),
+        "monitor_output_frames_dropped_total": ("counter", "Frames descartados por el writer", []),
+        "monitor_fps": ("gauge", "Frames analizados por segundo", []),
+        "monitor_score": ("gauge", "Score suavizado actual", []),
+        "monitor_state": ("gauge", "1 para el estado actual", []),
+        "monitor_time_in_state_seconds": ("gauge", "Segundos desde el último cambio de estado", []),
+        "monitor_intervals_total": ("counter", "Intervalos de operación registrados", []),
+        "monitor_stage_latency_seconds": ("summary", "Latencia por etapa (ventana móvil)", []),
+    }
+    for m in sources:
+        src = f'source="{_esc(m.name)}"'
+        rows["monitor_frames_processed_total"][2].append((src, m.frames))
+        rows["monitor_frames_dropped_total"][2].append((src, m.dropped))
+        rows["monitor_output_frames_dropped_total"][2].append((src, m.out_dropped))
+        rows["monitor_fps"][2].append((src, m.fps))
+        rows["monitor_score"][2].append((src, m.score))
+        state = m.state
+        for s in STATES:
+            rows["monitor_state"][2].append((f'{src},state="{s}"', int(s == state)))
+        rows["monitor_time_in_state_seconds"][2].append((src, now - m.state_since))
+        rows["monitor_intervals_total"][2].append((src, m.intervals))
+        if m.timer is not None:
+            for stage, st in m.timer.stats().items():
+                for q, label in (("50", "0.5"), ("95", "0.95"), ("99", "0.99")):
+                    rows["monitor_stage_latency_seconds"][2].append(
+                        (f'{src},stage="{_esc(stage)}",quantile="{label}"', st[f"p{q}_ms"] / 1000.0))
+                rows["monitor_stage_latency_seconds"][2].append(
+                    (f'{src},stage="{_esc(stage)}"', ("sum", st["sum_s"])))
+                rows["monitor_stage_latency_seconds"][2].append(
+                    (f'{src},stage="{_esc(stage)}"', ("count", st["n"])))
+    lines = []
+    for name, (kind, help_text, samples) in rows.items():
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if isinstance(value, tuple):
+                lines.append(f"{name}_{value[0]}{{{labels}}} {value[1]}")
+            else:
+                lines.append(f"{name}{{{labels}}} {value:g}" if isinstance(value, float)
+                             else f"{name}{{{labels}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """HTTP endpoint on a daemon thread; ``port=0`` picks a free port (see :attr:`port`)."""
+
+    def __init__(self, port: int = 9108, host: str = "127.0.0.1") -> None:
+        self.sources: Dict[str, SourceMetrics] = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802 (API de http.server)
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = render_metrics(list(server.sources.values())).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):  # sin ruido en stdout
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.host = host
+        self.port = self.httpd.server_address[1]
+        self.thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, timer=None) -> SourceMetrics:
+        m = SourceMetrics(name, timer)
+        self.sources[name] = m
+        return m
+
+    def start(self) -> "MetricsServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,5 +1,8 @@
 import os
+import threading
+import time
 import cv2
+from collections import deque
 from datetime import datetime
 
 def ensure_dir(path):
@@ -30,3 +33,103 @@ class CSVRecorder:
         dur = ts_end - ts_start
         with open(self.csv_path, "a", encoding="utf-8") as f:
             f.write(f"{base},{src},{start_iso},{end_iso},{dur:.3f}\n")
+
+class AsyncVideoWriter:
+    """
+    VideoWriter asíncrono: codifica en un hilo aparte detrás de una cola acotada.
+
+    ``write(frame, overlay)`` encola el frame; si se da ``overlay``, el hilo de
+    escritura llama ``render(frame, overlay)`` antes de codificar. Con la cola
+    llena se aplica ``policy``:
+      - "block": espera (no se pierde nada; el análisis siente la contrapresión)
+      - "drop_oldest": descarta el frame más antiguo pendiente
+      - "raw": deja de dibujar overlays hasta vaciar la mitad de la cola y
+        conserva todos los frames (la cola puede crecer hasta 2x antes de esperar)
+    Con ``timer`` (ver ``src/utils/timing.py``) se miden las etapas ``out_draw``
+    y ``encode`` del hilo de escritura.
+    """
+    POLICIES = ("block", "drop_oldest", "raw")
+
+    def __init__(self, out_path, fps_in, size, maxsize=32, policy="block", render=None, timer=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Política de escritura desconocida: {policy}")
+        self.writer = make_videowriter(out_path, fps_in, size)
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.render = render
+        self.timer = timer
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.degraded = False
+        self.written = 0
+        self.dropped = 0
+        self.raw_frames = 0
+        self.max_queued = 0
+        self.error = None
+        self.thread = threading.Thread(target=self._loop, name="video-writer", daemon=True)
+        self.thread.start()
+
+    @property
+    def queued(self):
+        return len(self.pending)
+
+    def write(self, frame, overlay=None):
+        if self.error is not None:
+            raise self.error
+        with self.cond:
+            limit = self.maxsize * 2 if self.policy == "raw" else self.maxsize
+            if len(self.pending) >= self.maxsize:
+                if self.policy == "drop_oldest":
+                    self.pending.popleft()
+                    self.dropped += 1
+                elif self.policy == "raw":
+                    self.degraded = True
+            self.cond.wait_for(lambda: len(self.pending) < limit or self.error is not None)
+            self.pending.append((frame, overlay))
+            self.max_queued = max(self.max_queued, len(self.pending))
+            self.cond.notify_all()
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending or self.closed)
+                if not self.pending:
+                    return
+                frame, overlay = self.pending.popleft()
+                if self.degraded and len(self.pending) <= self.maxsize // 2:
+                    self.degraded = False
+                raw = self.degraded
+                self.cond.notify_all()
+            try:
+                t0 = time.perf_counter_ns()
+                if overlay is not None and self.render is not None:
+                    if raw:
+                        self.raw_frames += 1
+                    else:
+                        self.render(frame, overlay)
+                t1 = time.perf_counter_ns()
+                self.writer.write(frame)
+                self.written += 1
+                if self.timer is not None:
+                    self.timer.add("out_draw", t1 - t0)
+                    self.timer.add("encode", time.perf_counter_ns() - t1)
+            except BaseException as exc:  # se re-lanza en el hilo productor
+                with self.cond:
+                    self.error = exc
+                    self.pending.clear()
+                    self.cond.notify_all()
+                return
+
+    def stats(self):
+        return {"written": self.written, "dropped": self.dropped, "raw": self.raw_frames,
+                "queued": self.queued, "max_queued": self.max_queued}
+
+    def release(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+        self.writer.release()
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,68 @@
+"""Warm-start snapshots of the motion engines, keyed per camera.
+
+Background-subtraction engines need hundreds of frames to settle, so every
+restart (and every new hourly file of the same camera) used to begin with a
+burst of false motion.  Engines that support it expose ``snapshot()`` (a dict
+of arrays: background image, recent frames...) and ``restore(state, frame)``;
+the state is saved as ``<state_dir>/<camera>.<engine>.npz`` at the end of a
+run (and periodically) and restored instead of ``initialize`` on the next one.
+
+The camera key is ``cam_N`` for device indices and, for files, the name
+without its trailing date/time/sequence, so ``linea3_2026-01-01_0800.mp4`` and
+``linea3_2026-01-01_0900.mp4`` share ``linea3``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from typing import Optional, Tuple
+
+import numpy as np
+
+_STAMP = re.compile(r"(^|[\W_]+)\d[\d\W_]*$")
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+
+def camera_key(src: str) -> str:
+    src = str(src)
+    if src.isdigit():
+        return f"cam_{src}"
+    if "://" in src:
+        return _UNSAFE.sub("_", src.split("://", 1)[1]).strip("_") or "stream"
+    stem = os.path.splitext(os.path.basename(src))[0]
+    key = _STAMP.sub("", stem)
+    if not key:  # el nombre es sólo fecha/hora: usar el directorio
+        key = os.path.basename(os.path.dirname(os.path.abspath(src))) or stem
+    return _UNSAFE.sub("_", key)
+
+
+def snapshot_path(state_dir: str, key: str, engine: str) -> str:
+    return os.path.join(state_dir, f"{key}.{engine}.npz")
+
+
+def save_snapshot(path: str, state: dict, meta: dict) -> str:
+    """Write ``state`` (name -> array) and ``meta`` compressed and atomically (tmp + rename)."""
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    tmp = path + ".tmp.npz"
+    arrays = {k: np.asarray(v) for k, v in state.items() if v is not None}
+    np.savez_compressed(tmp, __meta__=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def load_snapshot(path: str) -> Optional[Tuple[dict, dict]]:
+    """``(state, meta)`` or ``None`` if the file is missing or unreadable."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["__meta__"]))
+            state = {k: z[k] for k in z.files if k != "__meta__"}
+    except (OSError, ValueError, KeyError) as exc:
+        print(f"[WARN] Snapshot ilegible {path}: {exc}")
+        return None
+    return state, meta
@@ -0,0 +1,87 @@
+"""Per-frame score traces cached next to the analysis outputs.
+
+A run over a file records ``(t, score)`` for every analysed frame, where
+``t`` is the media time in seconds and ``score`` the raw (unsmoothed) engine
+score.  The trace is saved as a structured ``.npy`` (12 bytes per frame) that
+is opened memory-mapped, plus a small ``.json`` with the run metadata.
+
+The file name is derived from a content fingerprint of the video and every
+parameter that changes the raw score (engine and its tuning, resolutions,
+skip, ROI...).  Thresholds, smoothing and timers are *not* part of the key, so
+``python -m src replay`` can re-run only the hysteresis on a cached trace.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from array import array
+from typing import Optional, Tuple
+
+import numpy as np
+
+TRACE_DTYPE = np.dtype([("t", "<f8"), ("score", "<f4")])
+_CHUNK = 1 << 20
+
+
+def fingerprint(path: str) -> str:
+    """Hash of the file size plus its first and last MiB (fast on large videos)."""
+    size = os.path.getsize(path)
+    h = hashlib.sha1(str(size).encode())
+    with open(path, "rb") as f:
+        h.update(f.read(_CHUNK))
+        if size > 2 * _CHUNK:
+            f.seek(-_CHUNK, os.SEEK_END)
+            h.update(f.read(_CHUNK))
+    return h.hexdigest()
+
+
+def trace_key(fp: str, params: dict) -> str:
+    blob = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1((fp + blob).encode()).hexdigest()[:16]
+
+
+def trace_path(trace_dir: str, src: str, key: str) -> str:
+    base = os.path.splitext(os.path.basename(src))[0]
+    return os.path.join(trace_dir, f"{base}.{key}.npy")
+
+
+class TraceWriter:
+    """Accumulate ``(t, score)`` pairs in compact arrays and save them at the end."""
+
+    def __init__(self) -> None:
+        self.t = array("d")
+        self.score = array("f")
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def append(self, t: float, score: float) -> None:
+        self.t.append(t)
+        self.score.append(score)
+
+    def save(self, path: str, meta: dict) -> str:
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        data = np.empty(len(self.t), TRACE_DTYPE)
+        data["t"] = np.frombuffer(self.t, np.float64)
+        data["score"] = np.frombuffer(self.score, np.float32)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:     # np.save añadiría ".npy" a una ruta sin extensión
+            np.save(f, data)
+        with open(path[:-4] + ".json", "w", encoding="utf-8") as f:
+            json.dump({**meta, "frames": len(data)}, f, indent=2)
+        os.replace(tmp, path)          # la traza sólo aparece completa
+        return path
+
+
+def load_trace(path: str) -> Optional[Tuple[np.ndarray, dict]]:
+    """Memory-mapped trace and its metadata, or ``None`` if not cached."""
+    meta_path = path[:-4] + ".json"
+    if not (os.path.isfile(path) and os.path.isfile(meta_path)):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    return np.load(path, mmap_mode="r"), meta
@@ -0,0 +1,357 @@
+"""Several cameras in one process with a fair, state-aware scheduler.
+
+``python -m src multi --src 0 --src 1 --src rtsp://...`` opens every source
+with its own :class:`~src.utils.camera.FrameReader` capture thread, engine,
+score history, state machine and CSV stream.  A single thread pool analyses
+the freshest frame of each camera; the scheduler hands out work round-robin
+so no camera starves, serves cameras in (or close to) OPERACION first and,
+when the pool cannot keep up, lowers the analysis rate of IDLE cameras
+before touching the active ones.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+from .cli import add_processing_arguments, iso, make_engine, save_engine_state, step_engine, warm_start
+from .io.metrics import MetricsServer
+from .io.recorders import CSVRecorder
+from .io.snapshots import camera_key
+from .pipeline.frame_context import FrameContext
+from .pipeline.state_machine import OperationStateMachine
+from .utils.camera import FrameReader
+from .utils.clock import WallClock
+from .utils.draw import ScoreRing, draw_mini_mask, draw_small_graph, draw_status_banner
+from .utils.roi import load_roi
+from .utils.scaling import to_analysis
+from .utils.smoothing import make_smoother
+from .utils.timing import NULL_TIMER, StageTimer
+
+
+def source_name(src: str) -> str:
+    if src.isdigit():
+        return f"cam_{src}"
+    base = os.path.splitext(os.path.basename(src.rstrip("/")))[0]
+    return base or "src"
+
+
+def unique_names(sources):
+    """Names for CSV files and stats, suffixed ``_2``, ``_3``... on collision."""
+    seen = {}
+    names = []
+    for src in sources:
+        name = source_name(src)
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+
+class CameraStream:
+    """Per-camera state: capture thread, engine, smoothing and hysteresis."""
+
+    def __init__(self, src: str, args: argparse.Namespace, name: str = "") -> None:
+        self.src = src
+        self.name = name or source_name(src)
+        self.args = args
+        cap = self._open()
+        if not cap.isOpened():
+            raise RuntimeError(f"No pude abrir la fuente {src}.")
+        # cámaras y streams se reabren si se caen; sólo un archivo termina
+        live = not os.path.isfile(src)
+        self.reader = FrameReader(cap, clock=WallClock(), reopen=self._open if live else None,
+                                  reopen_max_sec=args.reconnect_max_sec)
+        self.reconnects = 0
+        self.lost_reported = False
+        self.engine = None  # se crea con el primer frame, cuando se conoce la escala de análisis
+        self.roi = load_roi(src, args.roi_config, args.roi, args.exclude)
+        self.initialized = False
+        self.size = None
+        self.score_hist = ScoreRing(max(10, args.smooth_k))
+        self.smoother = make_smoother(args.smoother, args.smooth_k, args.smooth_sec)
+        self.score_s = 0.0
+        self.fsm = None
+        self.csv_rec = None
+        if args.csv:
+            self.csv_rec = CSVRecorder(args.csv.replace("{name}", self.name))
+        self.last_seq = 0
+        self.last_proc_ts = 0.0
+        self.last_ts = None  # ts del último frame analizado; cierra el intervalo abierto
+        self.processed = 0
+        self.dropped = 0
+        self.intervals = 0
+        self.vis = None
+        self.timer = StageTimer() if (args.timing or args.metrics_port >= 0) else NULL_TIMER
+        self.metrics = None  # SourceMetrics si hay endpoint de métricas
+        self.state_key = camera_key(src)  # --state_key es único por proceso: no aplica con varias cámaras
+        self.state_ts = 0.0
+
+    def _open(self) -> cv2.VideoCapture:
+        return cv2.VideoCapture(int(self.src) if self.src.isdigit() else self.src)
+
+    @property
+    def status(self) -> str:
+        return self.fsm.status if self.fsm is not None else "IDLE"
+
+    def report_link(self) -> None:
+        """Warn once when the source drops and again when the reader reopens it."""
+        if self.reader.lost and not self.lost_reported:
+            self.lost_reported = True
+            print(f"[WARN] {self.name}: sin frames de {self.src}; reintentando conexión...")
+        if self.reader.reconnects != self.reconnects:
+            self.reconnects = self.reader.reconnects
+            self.lost_reported = False
+            print(f"[OK] {self.name}: fuente reconectada ({self.reconnects} reconexiones).")
+
+    def finished(self) -> bool:
+        """End of stream reached and its last frame already taken."""
+        return self.reader.eos.is_set() and self.reader.read_next(self.last_seq) is None
+
+    def is_hot(self) -> bool:
+        """Active or about to become active/inactive: never degraded."""
+        return self.status == "OPERACION" or self.score_s >= self.args.down_threshold
+
+    def process(self, ts: float, frame, draw: bool) -> None:
+        """Analyse one frame (runs on a pool thread; one frame in flight per camera)."""
+        self.last_ts = ts
+        if self.size is None:
+            h, w = frame.shape[:2]
+            self.size = (self.args.width, max(1, int(h * self.args.width / float(w))))
+        ana_w = self.args.analysis_width if self.args.analysis_width > 0 else self.size[0]
+        self.timer.mark()
+        ana = to_analysis(frame, ana_w, self.args.pyr_levels)
+        self.timer.lap("ana_resize")
+        if not self.initialized:
+            self.engine = make_engine(self.args.engine, self.args, scale=ana.shape[1] / float(self.size[0]))
+            if self.roi:
+                self.roi.bind(ana.shape[1], ana.shape[0], frame.shape[1], frame.shape[0])
+            restored = warm_start(self.engine, self.args, self.roi.crop(ana) if self.roi else ana, self.state_key)
+            if restored:
+                print(f"[OK] {self.name}: modelo de fondo restaurado ({restored})")
+            self.state_ts = ts
+            self.fsm = OperationStateMachine(self.args.up_threshold, self.args.down_threshold,
+                                             self.args.min_active_sec, self.args.idle_stop_sec, start_ts=ts)
+            self.initialized = True
+            return
+        score, mask = step_engine(self.engine, FrameContext(self.roi.crop(ana) if self.roi else ana),
+                                  self.args, self.roi)
+        self.timer.lap("engine")
+        self.score_hist.append(score)
+        self.score_s = self.smoother.update(score, ts)
+        interval = self.fsm.update(self.score_s, ts)
+        if interval is not None:
+            self.intervals += 1
+            if self.csv_rec:
+                self.csv_rec.append_interval(self.src, *interval)
+            print(f"[OK] {self.name}: {iso(interval[0])} -> {iso(interval[1])}  ({interval[1]-interval[0]:.1f}s)")
+        self.processed += 1
+        if self.args.state_dir and self.args.state_sec > 0 and ts - self.state_ts >= self.args.state_sec:
+            self.state_ts = ts
+            save_engine_state(self.engine, self.args, self.state_key, self.src)
+        self.timer.lap("fsm")
+        if self.metrics is not None:
+            m = self.metrics
+            m.frames = self.processed
+            m.dropped = self.dropped
+            m.score = self.score_s
+            m.set_state(self.fsm.status)
+            m.intervals = self.intervals
+        if draw:
+            frame = cv2.resize(frame, self.size)
+            draw_status_banner(frame, self.status, self.score_s, self.args.up_threshold,
+                               self.args.down_threshold, 0.0)
+            draw_small_graph(frame, self.score_hist.values(), self.name)
+            if self.roi:
+                self.roi.draw(frame)
+                mask = self.roi.expand(mask)
+            if mask is not None:
+                draw_mini_mask(frame, mask, (10, frame.shape[0]-10),
+                               scale=0.25 * frame.shape[1] / mask.shape[1])
+            self.vis = frame
+            self.timer.lap("draw")
+
+    def close(self) -> None:
+        self.reader.stop()
+        self.reader.cap.release()
+        if self.engine is not None:
+            save_engine_state(self.engine, self.args, self.state_key, self.src)
+        if self.fsm is not None:
+            interval = self.fsm.close(self.last_ts)
+            if interval is not None:
+                self.intervals += 1
+                if self.csv_rec:
+                    self.csv_rec.append_interval(self.src, *interval)
+                print(f"[OK] {self.name} al cierre: {iso(interval[0])} -> {iso(interval[1])}")
+
+
+class FairScheduler:
+    """
+    Round-robin over cameras with a fresh frame, hot cameras first.
+
+    ``idle_period`` is the minimum time between two analysed frames of an IDLE
+    camera.  It starts at 0 (full rate), grows while more cameras are ready
+    than there are free workers and decays back once the pool keeps up.
+    """
+
+    def __init__(self, streams, max_idle_period: float = 1.0) -> None:
+        self.streams = streams
+        self.rr = 0
+        self.idle_period = 0.0
+        self.max_idle_period = max_idle_period
+
+    def pick(self, inflight: set, free_slots: int, now: float):
+        n = len(self.streams)
+        order = [self.streams[(self.rr + i) % n] for i in range(n)]
+        ready = [s for s in order
+                 if s not in inflight and s.reader.read_next(s.last_seq) is not None]
+        due = [s for s in ready
+               if s.is_hot() or not s.initialized or now - s.last_proc_ts >= self.idle_period]
+        due.sort(key=lambda s: not s.is_hot())   # orden estable: conserva el round-robin
+        chosen = due[:free_slots]
+
+        if len(due) > free_slots:
+            self.idle_period = min(self.max_idle_period, self.idle_period * 1.5 + 0.02)
+        elif not due or len(due) < free_slots:
+            self.idle_period *= 0.95
+            if self.idle_period < 1e-3:
+                self.idle_period = 0.0
+        if chosen:
+            self.rr = (self.streams.index(chosen[-1]) + 1) % n
+        return chosen
+
+
+def mosaic(streams, tile_w: int):
+    tiles = []
+    for s in streams:
+        vis = s.vis
+        if vis is None:
+            vis = np.zeros((int(tile_w * 9 / 16), tile_w, 3), np.uint8)
+        h = int(vis.shape[0] * tile_w / vis.shape[1])
+        tiles.append(cv2.resize(vis, (tile_w, h)))
+    tile_h = max(t.shape[0] for t in tiles)
+    tiles = [cv2.copyMakeBorder(t, 0, tile_h - t.shape[0], 0, 0, cv2.BORDER_CONSTANT) for t in tiles]
+    cols = int(np.ceil(np.sqrt(len(tiles))))
+    while len(tiles) % cols:
+        tiles.append(np.zeros_like(tiles[0]))
+    rows = [np.hstack(tiles[i:i + cols]) for i in range(0, len(tiles), cols)]
+    return np.vstack(rows)
+
+
+# Opciones de la corrida de una sola fuente que ``multi`` no implementa: cada
+# cámara se lee en vivo (modo "latest", reloj de pared) y el planificador
+# decide qué frames se analizan.
+UNSUPPORTED = ("skip", "analysis_fps", "seek_min_skip", "capture_mode", "queue_size", "clock",
+               "start_time", "grid", "heatmap", "adaptive", "trace_dir", "state_key", "debug",
+               "timing_sec", "timing_out")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        prog="python -m src multi",
+        description="Monitorea varias cámaras en un solo proceso con un pool compartido.",
+    )
+    ap.add_argument("--src", action="append", required=True,
+                    help="Fuente (índice de cámara o URL); repetir por cada cámara")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                    help="Hilos de análisis compartidos")
+    ap.add_argument("--max_idle_period", type=float, default=1.0,
+                    help="Periodo máximo (s) entre frames analizados de una cámara IDLE bajo sobrecarga")
+    ap.add_argument("--display", action="store_true", help="Muestra un mosaico con todas las cámaras")
+    ap.add_argument("--display_width", type=int, default=1280, help="Ancho del mosaico")
+    ap.add_argument("--stats_sec", type=float, default=10.0, help="Cada cuántos segundos imprimir estadísticas")
+    ap.add_argument("--reconnect_max_sec", type=float, default=30.0,
+                    help="Espera máxima (s) entre reintentos al reabrir una cámara o stream caído")
+    add_processing_arguments(ap)
+    ap.set_defaults(csv="outputs/csv/operacion_{name}.csv", clock="wall")
+    return ap
+
+
+def main(argv=None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if "," in args.engine:
+        parser.error(f"--engine {args.engine}: cada cámara usa un solo motor.")
+    ignored = [f"--{k}" for k in UNSUPPORTED if getattr(args, k) != parser.get_default(k)]
+    if ignored:
+        parser.error(f"{', '.join(ignored)}: no soportado en 'multi'.")
+    streams = [CameraStream(src, args, name) for src, name in zip(args.src, unique_names(args.src))]
+    for s in streams:
+        s.reader.start()
+    metrics_server = None
+    if args.metrics_port >= 0:
+        metrics_server = MetricsServer(args.metrics_port, args.metrics_host).start()
+        for s in streams:
+            s.metrics = metrics_server.register(s.name, s.timer)
+        print(f"[OK] Métricas en http://{metrics_server.host}:{metrics_server.port}/metrics")
+    scheduler = FairScheduler(streams, args.max_idle_period)
+    cols = int(np.ceil(np.sqrt(len(streams))))
+    tile_w = max(160, args.display_width // cols)
+    if args.display:
+        cv2.namedWindow("monitor-multi", cv2.WINDOW_NORMAL)
+
+    print(f"[OK] {len(streams)} cámaras, {args.workers} hilos de análisis. Ctrl+C para salir.")
+    inflight = {}
+    t_stats = t_disp = time.time()
+    last_counts = {s: 0 for s in streams}
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="engine") as pool:
+            while True:
+                now = time.time()
+                for s in scheduler.pick(set(inflight.values()), args.workers - len(inflight), now):
+                    seq, ts, frame = s.reader.read_next(s.last_seq)
+                    if s.last_seq:
+                        s.dropped += seq - s.last_seq - 1
+                    s.last_seq = seq
+                    s.last_proc_ts = now
+                    inflight[pool.submit(s.process, ts, frame, args.display)] = s
+
+                if inflight:
+                    done, _ = wait(list(inflight), timeout=0.005, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        inflight.pop(fut)
+                        fut.result()
+                else:
+                    if all(s.finished() for s in streams):
+                        print("[OK] Fin de todas las fuentes.")
+                        break
+                    time.sleep(0.002)
+
+                for s in streams:
+                    s.report_link()
+
+                if args.display and now - t_disp >= 1 / 30:
+                    t_disp = now
+                    cv2.imshow("monitor-multi", mosaic(streams, tile_w))
+                    if (cv2.waitKey(1) & 0xFF) == 27:
+                        break
+
+                if now - t_stats >= args.stats_sec:
+                    dt = now - t_stats
+                    parts = []
+                    for s in streams:
+                        fps = (s.processed - last_counts[s]) / dt
+                        last_counts[s] = s.processed
+                        if s.metrics is not None:
+                            s.metrics.fps = fps
+                        link = " SIN SEÑAL" if s.reader.lost else ""
+                        parts.append(f"{s.name}:{s.status[:4]} {fps:.1f}fps drop={s.dropped}{link}")
+                    print(f"[STATS] idle_period={scheduler.idle_period:.2f}s  " + "  ".join(parts))
+                    if args.timing:
+                        for s in streams:
+                            print(f"[TIME] {s.name}  {s.timer.log_line()}")
+                    t_stats = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for s in streams:
+            s.close()
+        if metrics_server is not None:
+            metrics_server.stop()
+        if args.display:
+            cv2.destroyAllWindows()
+    print("[OK] Finalizado.")
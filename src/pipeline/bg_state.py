@@ -0,0 +1,43 @@
+from collections import deque
+
+import numpy as np
+
+
+class BackgroundReplay:
+    """
+    Estado reanudable de un sustractor de fondo de OpenCV (MOG2/KNN):
+      - imagen de fondo actual (``getBackgroundImage``)
+      - buffer corto de frames recientes: uno cada ``every`` frames, hasta ``size``
+    ``restore`` reinicia el modelo con el fondo guardado (learningRate=1), lo
+    reentrena con los frames recientes y lo consolida de nuevo con el fondo, así
+    el modelo arranca con la varianza aprendida en vez de un solo frame.
+    """
+    def __init__(self, size=16, every=30):
+        self.frames = deque(maxlen=max(1, int(size)))
+        self.every = max(1, int(every))
+        self.n = 0
+
+    def push(self, frame_bgr):
+        if self.n % self.every == 0:
+            self.frames.append(frame_bgr.copy())
+        self.n += 1
+
+    def snapshot(self, bg):
+        state = {"background": bg.getBackgroundImage()}
+        if self.frames:
+            state["frames"] = np.stack(self.frames)
+        return state
+
+    def restore(self, bg, state, frame_bgr, lr=0.05):
+        back = state.get("background")
+        if back is None or back.shape != frame_bgr.shape:
+            return False
+        bg.apply(back, learningRate=1.0)
+        frames = state.get("frames")
+        if frames is not None and frames.shape[1:] == frame_bgr.shape:
+            for f in frames:
+                bg.apply(f, learningRate=lr)
+                self.frames.append(f.copy())
+        for _ in range(5):
+            bg.apply(back, learningRate=lr)
+        return True
@@ -0,0 +1,105 @@
+import cv2
+import numpy as np
+
+from .frame_context import as_context
+
+
+class CascadeMotion:
+    """
+    Cascada: compuerta barata antes de un motor costoso (flow, knn, mog2...):
+      - Gris reducido a ``gate_width`` px (INTER_AREA) y |t - t-1|; el gris se
+        comparte con el motor interno a través del ``FrameContext``
+      - Frame duplicado (diferencia máxima <= ``dup_thr``) -> se omite siempre
+      - Fracción de pixeles con diferencia > ``gate_diff_thr`` >= ``pre_thr``
+        -> se ejecuta el motor interno
+      - Tras actividad el motor sigue ``hold_frames`` frames más, y cada
+        ``refresh_every`` frames se ejecuta igual para mantener su modelo de fondo
+      - Los motores frame a frame (diff, edges, flow, lk: sin ``snapshot``) se
+        re-inicializan con el frame anterior antes de volver a ejecutarse tras
+        frames omitidos; si no, compararían contra un frame viejo
+    Cuando la compuerta omite el motor el score es 0 y la máscara está vacía.
+    """
+    def __init__(self, inner, gate_width=160, gate_diff_thr=12, pre_thr=0.002,
+                 refresh_every=30, hold_frames=15, dup_thr=0):
+        self.inner = inner
+        self.gate_width = max(16, int(gate_width))
+        self.gate_diff_thr = int(gate_diff_thr)
+        self.pre_thr = float(pre_thr)
+        self.refresh_every = max(0, int(refresh_every))
+        self.hold_frames = max(0, int(hold_frames))
+        self.dup_thr = int(dup_thr)
+        # los motores con modelo de fondo no dependen del frame anterior
+        self.reprime = not hasattr(inner, "snapshot")
+        self.prev_ctx = None
+        self.stale = False
+        self.prev_small = None
+        self.empty = None
+        self.since_inner = 0
+        self.hold = 0
+        self.frames = 0
+        self.inner_calls = 0
+        self.duplicates = 0
+        self.gate_score = 0.0
+
+    def _small(self, ctx):
+        return ctx.gray_at(self.gate_width)
+
+    def initialize(self, frame_bgr):
+        ctx = as_context(frame_bgr)
+        self.inner.initialize(ctx)
+        self.prev_ctx = ctx
+        self.stale = False
+        self.prev_small = self._small(ctx)
+        self.empty = np.zeros(frame_bgr.shape[:2], np.uint8)
+
+    def snapshot(self):
+        return self.inner.snapshot() if hasattr(self.inner, "snapshot") else None
+
+    def restore(self, state, frame_bgr):
+        if not (hasattr(self.inner, "restore") and self.inner.restore(state, frame_bgr)):
+            return False
+        ctx = as_context(frame_bgr)
+        self.prev_ctx = ctx
+        self.stale = False
+        self.prev_small = self._small(ctx)
+        self.empty = np.zeros(frame_bgr.shape[:2], np.uint8)
+        return True
+
+    @property
+    def skipped(self):
+        return self.frames - self.inner_calls
+
+    @property
+    def skip_rate(self):
+        return self.skipped / float(self.frames) if self.frames else 0.0
+
+    def step(self, frame_bgr, min_area_pct=0.001):
+        ctx = as_context(frame_bgr)
+        prev_ctx, self.prev_ctx = self.prev_ctx, ctx
+        self.frames += 1
+        self.since_inner += 1
+        small = self._small(ctx)
+        diff = cv2.absdiff(small, self.prev_small)
+        self.prev_small = small
+        _, peak, _, _ = cv2.minMaxLoc(diff)
+        if peak <= self.dup_thr:
+            # frame repetido (cámara congelada, stream duplicado): nada que analizar
+            self.duplicates += 1
+            self.gate_score = 0.0
+            self.stale = True
+            return 0.0, self.empty
+        _, moving = cv2.threshold(diff, self.gate_diff_thr, 255, cv2.THRESH_BINARY)
+        self.gate_score = cv2.countNonZero(moving) / float(moving.size)
+        if self.gate_score >= self.pre_thr:
+            self.hold = self.hold_frames
+        elif self.hold > 0:
+            self.hold -= 1
+        elif not (self.refresh_every and self.since_inner >= self.refresh_every):
+            self.stale = True
+            return 0.0, self.empty
+        if self.stale and self.reprime:
+            self.inner.initialize(prev_ctx)
+        self.stale = False
+        self.since_inner = 0
+        self.inner_calls += 1
+        return self.inner.step(ctx, min_area_pct=min_area_pct)
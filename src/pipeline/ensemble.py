@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+FUSE_RULES = ("any", "all", "majority")
+
+
+def fuse_scores(values, rule="any"):
+    """
+    Score combinado de varios motores que comparten umbrales:
+      - ``any``: el máximo (basta un motor)
+      - ``all``: el mínimo (todos los motores)
+      - ``majority``: el k-ésimo mayor, k = n//2 + 1 (mayoría simple)
+    Cruzar un umbral con el score combinado equivale a ese voto entre motores.
+    """
+    if len(values) == 1:
+        return values[0]
+    if rule == "any":
+        return max(values)
+    if rule == "all":
+        return min(values)
+    return sorted(values, reverse=True)[len(values) // 2]
+
+
+class EngineSet:
+    """
+    Varios motores sobre el mismo frame de análisis (``--engine diff,mog2,flow``):
+      - ``step`` ejecuta todos en un pool de hilos (OpenCV libera el GIL)
+      - cada motor tiene su suavizado y su máquina de estados, con intervalos propios
+      - ``fuse`` combina los scores (ver :func:`fuse_scores`) para la máquina de
+        estados principal y el HUD; la máscara mostrada es la unión de todas
+    """
+    def __init__(self, names, engines, smoothers, fsms, fuse="any", workers=0):
+        self.names = list(names)
+        self.engines = list(engines)
+        self.smoothers = list(smoothers)
+        self.fsms = list(fsms)
+        self.fuse = fuse
+        n = len(self.engines)
+        workers = n if workers <= 0 else min(workers, n)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="engine") if workers > 1 else None
+        self.scores = [0.0] * n
+        self.score_s = [0.0] * n
+        self.intervals = [0] * n
+        self.active_sec = [0.0] * n
+
+    def step(self, fn):
+        """``fn(engine) -> (score, mask)`` en todos; devuelve el score crudo combinado y la unión de máscaras."""
+        results = list(self.pool.map(fn, self.engines)) if self.pool else [fn(e) for e in self.engines]
+        self.scores = [s for s, _ in results]
+        masks = [m for _, m in results if m is not None]
+        mask = None
+        if masks:
+            mask = masks[0].copy()
+            for m in masks[1:]:
+                cv2.bitwise_or(mask, m, dst=mask)
+        return fuse_scores(self.scores, self.fuse), mask
+
+    def update(self, ts):
+        """Suaviza y actualiza cada máquina de estados; devuelve (score suavizado combinado, [(i, intervalo)])."""
+        closed = []
+        for i, (sm, fsm) in enumerate(zip(self.smoothers, self.fsms)):
+            self.score_s[i] = sm.update(self.scores[i], ts)
+            interval = fsm.update(self.score_s[i], ts)
+            if interval is not None:
+                closed.append((i, self._count(i, interval)))
+        return fuse_scores(self.score_s, self.fuse), closed
+
+    def close(self, ts):
+        closed = []
+        for i, fsm in enumerate(self.fsms):
+            interval = fsm.close(ts)
+            if interval is not None:
+                closed.append((i, self._count(i, interval)))
+        return closed
+
+    def _count(self, i, interval):
+        self.intervals[i] += 1
+        self.active_sec[i] += interval[1] - interval[0]
+        return interval
+
+    def rows(self):
+        """``[(nombre, estado, score suavizado)]`` para el HUD."""
+        return [(n, f.status, s) for n, f, s in zip(self.names, self.fsms, self.score_s)]
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
@@ -1,44 +1,87 @@
 import cv2
 import numpy as np
 
+from .frame_context import as_context
+from .postprocess import filter_small_blobs, score_from_mask
+
+# (pyr_scale, levels, winsize, iterations, poly_n, poly_sigma) de Farnebäck
+FARNEBACK_PARAMS = (0.5, 3, 15, 3, 5, 1.2)
+
+FLOW_PRESETS = ("farneback", "warm", "half", "dis_ultrafast", "dis_fast", "dis_medium")
+
+_DIS_PRESETS = {
+    "dis_ultrafast": "DISOPTICAL_FLOW_PRESET_ULTRAFAST",
+    "dis_fast": "DISOPTICAL_FLOW_PRESET_FAST",
+    "dis_medium": "DISOPTICAL_FLOW_PRESET_MEDIUM",
+}
+
 class FlowMotion:
     """
-    Flujo óptico (Farnebäck):
-      - Magnitud de movimiento por pixel
+    Flujo óptico denso:
+      - Magnitud de movimiento por pixel (sin ángulo, en un buffer reutilizado)
       - Más costoso en CPU pero sensible a movimientos suaves
+    Presets de velocidad (``preset``):
+      - ``farneback``: Farnebäck original (3 niveles, 3 iteraciones)
+      - ``warm``: Farnebäck con OPTFLOW_USE_INITIAL_FLOW desde el flujo anterior,
+        lo que permite 2 niveles y 1 iteración
+      - ``half``: Farnebäck sobre un pyrDown (1/4 de pixeles); la máscara se
+        reescala al tamaño original
+      - ``dis_ultrafast``/``dis_fast``/``dis_medium``: DIS optical flow
     """
-    def __init__(self, flow_thr=0.7, min_blob_area_px=80, morph_kernel=3):
+    def __init__(self, flow_thr=0.7, min_blob_area_px=80, morph_kernel=3, preset="farneback"):
+        if preset not in FLOW_PRESETS:
+            raise ValueError(f"Preset de flujo desconocido: {preset} (opciones: {', '.join(FLOW_PRESETS)})")
         self.prev_gray = None
         self.flow_thr = float(flow_thr)
         k = morph_kernel if morph_kernel in (3,5) else 3
         self.kernel = np.ones((k,k), np.uint8)
         self.min_blob_area_px = max(0, int(min_blob_area_px))
+        self.preset = preset
+        self.dis = None
+        if preset in _DIS_PRESETS:
+            self.dis = cv2.DISOpticalFlow_create(getattr(cv2, _DIS_PRESETS[preset]))
+        self.flow = None
+        self.mag = None
+        self.mask = None
+        self.size = None
+        # en ``half`` los desplazamientos miden la mitad: se compara contra thr/2
+        self.thr = self.flow_thr / 2.0 if preset == "half" else self.flow_thr
+
+    def _gray(self, frame_bgr):
+        return as_context(frame_bgr).pyr(1 if self.preset == "half" else 0)
 
     def initialize(self, frame_bgr):
-        self.prev_gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+        self.prev_gray = self._gray(frame_bgr)
+        h, w = self.prev_gray.shape
+        self.flow = np.zeros((h, w, 2), np.float32)
+        self.mag = np.empty((h, w), np.float32)
+        self.mask = np.empty((h, w), np.uint8)
+        self.size = frame_bgr.shape[1::-1]
+
+    def _flow(self, gray):
+        if self.dis is not None:
+            # DIS parte del flujo anterior si recibe el buffer
+            return self.dis.calc(self.prev_gray, gray, self.flow)
+        if self.preset == "warm":
+            return cv2.calcOpticalFlowFarneback(self.prev_gray, gray, self.flow,
+                                                0.5, 2, 15, 1, 5, 1.2, cv2.OPTFLOW_USE_INITIAL_FLOW)
+        return cv2.calcOpticalFlowFarneback(self.prev_gray, gray, self.flow, *FARNEBACK_PARAMS, 0)
 
     def _mask_from_mag(self, mag):
-        mask = (mag >= self.flow_thr).astype(np.uint8) * 255
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
-        if self.min_blob_area_px > 0:
-            num, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
-            if num > 1:
-                keep = np.zeros_like(mask)
-                for i in range(1, num):
-                    if stats[i, cv2.CC_STAT_AREA] >= self.min_blob_area_px:
-                        keep[labels == i] = 255
-                mask = keep
+        cv2.compare(mag, self.thr, cv2.CMP_GE, dst=self.mask)
+        mask = cv2.morphologyEx(self.mask, cv2.MORPH_OPEN, self.kernel)
+        if self.preset == "half":
+            mask = cv2.resize(mask, self.size, interpolation=cv2.INTER_NEAREST)
+        mask = filter_small_blobs(mask, self.min_blob_area_px)
         return mask
 
     def step(self, frame_bgr, min_area_pct=0.001):
-        gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
-        flow = cv2.calcOpticalFlowFarneback(self.prev_gray, gray,
-                                            None, 0.5, 3, 15, 3, 5, 1.2, 0)
-        mag, _ = cv2.cartToPolar(flow[...,0], flow[...,1])
-        mask = self._mask_from_mag(mag)
-        active = float(np.count_nonzero(mask))
-        total  = float(mask.size)
-        frac   = active / max(1.0, total)
-        score  = max(frac, min_area_pct if frac >= min_area_pct else 0.0)
+        if self.prev_gray is None:
+            self.initialize(frame_bgr)
+        gray = self._gray(frame_bgr)
+        self.flow = self._flow(gray)
+        np.hypot(self.flow[..., 0], self.flow[..., 1], out=self.mag)
+        mask = self._mask_from_mag(self.mag)
+        score = score_from_mask(mask, min_area_pct)
         self.prev_gray = gray
         return float(score), mask
@@ -0,0 +1,70 @@
+import threading
+
+import cv2
+
+
+class FrameContext:
+    """
+    Frame de análisis con planos derivados calculados al primer acceso y
+    memorizados el resto del frame:
+      - ``bgr``: el frame original (sin copia)
+      - ``gray``: BGR -> gris
+      - ``blur(k)``: gris con GaussianBlur k x k
+      - ``pyr(n)``: gris tras n ``pyrDown`` (pyr(2) reutiliza pyr(1))
+      - ``gray_at(w)``: gris reducido a ``w`` px de ancho (INTER_AREA)
+      - ``hsv``: BGR -> HSV
+    Así varios consumidores del mismo frame (motores de ``--engine a,b``, la
+    compuerta de la cascada y su motor interno...) comparten el trabajo. Los
+    planos son de sólo lectura. Es seguro compartirlo entre los hilos de
+    ``EngineSet``: cada plano se calcula una sola vez.
+    """
+    __slots__ = ("bgr", "_planes", "_lock")
+
+    def __init__(self, frame_bgr):
+        self.bgr = frame_bgr
+        self._planes = {}
+        self._lock = threading.RLock()  # los planos se construyen unos sobre otros
+
+    @property
+    def shape(self):
+        return self.bgr.shape
+
+    def _plane(self, key, build):
+        plane = self._planes.get(key)
+        if plane is None:
+            with self._lock:
+                plane = self._planes.get(key)
+                if plane is None:
+                    plane = self._planes[key] = build()
+        return plane
+
+    @property
+    def gray(self):
+        return self._plane("gray", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def hsv(self):
+        return self._plane("hsv", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV))
+
+    def blur(self, k):
+        k = k if k % 2 == 1 else k + 1
+        return self._plane(("blur", k), lambda: cv2.GaussianBlur(self.gray, (k, k), 0))
+
+    def pyr(self, level):
+        if level <= 0:
+            return self.gray
+        return self._plane(("pyr", level), lambda: cv2.pyrDown(self.pyr(level - 1)))
+
+    def gray_at(self, width):
+        h, w = self.bgr.shape[:2]
+        width = min(int(width), w)
+        if width == w:
+            return self.gray
+        size = (width, max(1, int(round(h * width / float(w)))))
+        return self._plane(("gray_at", width),
+                           lambda: cv2.resize(self.gray, size, interpolation=cv2.INTER_AREA))
+
+
+def as_context(frame):
+    """Los motores aceptan un arreglo BGR o un ``FrameContext``."""
+    return frame if isinstance(frame, FrameContext) else FrameContext(frame)
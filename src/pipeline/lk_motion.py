@@ -0,0 +1,70 @@
+import cv2
+import numpy as np
+
+from .frame_context import as_context
+from .postprocess import score_from_mask
+
+class LKGridMotion:
+    """
+    Flujo óptico disperso (Lucas-Kanade piramidal) sobre una rejilla fija:
+      - Un punto por celda de ``grid_step`` px, rastreado de t-1 a t
+      - Desplazamiento por punto = mediana de los últimos ``median_k`` frames
+        (descarta saltos aislados del rastreo)
+      - Score = fracción de puntos con desplazamiento >= ``flow_thr``
+      - Máscara gruesa: la celda completa de cada punto en movimiento
+      - Puntos perdidos (status 0, fuera del frame o a más de media celda de su
+        ancla) vuelven a su posición de la rejilla en una sola pasada vectorizada
+      - ``min_eig`` descarta puntos sin textura (su desplazamiento sería ruido)
+    El costo depende del número de puntos y no del área, a diferencia de Farnebäck.
+    """
+    def __init__(self, flow_thr=0.7, grid_step=16, win_size=15, max_level=2, median_k=3,
+                 min_eig=1e-3):
+        self.flow_thr = float(flow_thr)
+        self.grid_step = max(4, int(grid_step))
+        self.median_k = max(1, int(median_k))
+        w = max(5, int(win_size)) | 1
+        self.lk_params = dict(winSize=(w, w), maxLevel=max(0, int(max_level)),
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+                              minEigThreshold=float(min_eig))
+        self.prev_gray = None
+        self.lost = 0
+
+    def initialize(self, frame_bgr):
+        gray = as_context(frame_bgr).gray
+        h, w = gray.shape
+        s = self.grid_step
+        self.gh, self.gw = max(1, h // s), max(1, w // s)
+        xx, yy = np.meshgrid(np.arange(self.gw) * s + s / 2.0, np.arange(self.gh) * s + s / 2.0)
+        self.anchors = np.stack([xx.ravel(), yy.ravel()], axis=1).astype(np.float32).reshape(-1, 1, 2)
+        self.pts = self.anchors.copy()
+        self.mags = np.zeros((self.median_k, len(self.anchors)), np.float32)
+        self.n = 0
+        self.limit = np.array([w - 1, h - 1], np.float32)
+        self.mask = np.zeros((h, w), np.uint8)
+        self.prev_gray = gray
+
+    def step(self, frame_bgr, min_area_pct=0.001):
+        gray = as_context(frame_bgr).gray
+        nxt, st, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.pts, None, **self.lk_params)
+        ok = st.ravel() == 1
+        p = nxt.reshape(-1, 2)
+        d = p - self.pts.reshape(-1, 2)
+        mag = self.mags[self.n % self.median_k]
+        np.hypot(d[:, 0], d[:, 1], out=mag)
+        mag[~ok] = 0.0
+        self.n += 1
+        med = np.median(self.mags, axis=0) if self.median_k > 1 else mag
+        cells = (med >= self.flow_thr).reshape(self.gh, self.gw).astype(np.uint8) * 255
+
+        # re-siembra: perdidos, fuera del frame o demasiado lejos de su ancla
+        off = np.abs(p - self.anchors.reshape(-1, 2)).max(axis=1)
+        lost = ~ok | (off > self.grid_step / 2.0) | (p < 0).any(axis=1) | (p > self.limit).any(axis=1)
+        self.pts = np.where(lost[:, None, None], self.anchors, nxt)
+        self.lost = int(np.count_nonzero(lost))
+
+        s = self.grid_step
+        self.mask[:self.gh * s, :self.gw * s] = cv2.resize(cells, (self.gw * s, self.gh * s),
+                                                          interpolation=cv2.INTER_NEAREST)
+        score = score_from_mask(cells, min_area_pct)
+        self.prev_gray = gray
+        return float(score), self.mask.copy()
@@ -1,6 +1,10 @@
 import cv2
 import numpy as np
 
+from .bg_state import BackgroundReplay
+from .frame_context import as_context
+from .postprocess import filter_small_blobs, score_from_mask
+
 class Mog2Motion:
     """
     Sustracción de fondo MOG2 afinada:
@@ -8,6 +12,7 @@ class Mog2Motion:
       - learningRate configurable (auto por defecto)
       - remoción de sombras (umbral > 128)
       - morfología (OPEN) + descarte de blobs pequeños
+      - snapshot/restore del modelo para arrancar en caliente
     """
     def __init__(self, history=600, varThreshold=25.0, detectShadows=True, learningRate=-1.0,
                  min_blob_area_px=80, morph_kernel=3):
@@ -18,33 +23,35 @@ class Mog2Motion:
         k = morph_kernel if morph_kernel in (3,5) else 3
         self.kernel = np.ones((k,k), np.uint8)
         self.min_blob_area_px = max(0, int(min_blob_area_px))
+        self.replay = BackgroundReplay(size=16, every=max(1, history // 16))
 
     def initialize(self, frame_bgr):
         # "Templado" inicial del fondo
+        frame_bgr = as_context(frame_bgr).bgr
         for _ in range(5):
             self.bg.apply(frame_bgr, learningRate=0.05)
+        self.replay.push(frame_bgr)
+
+    def snapshot(self):
+        """Fondo + frames recientes para reanudar en caliente (ver src/io/snapshots.py)."""
+        return self.replay.snapshot(self.bg)
+
+    def restore(self, state, frame_bgr):
+        """Arranca desde ``state`` en vez de ``initialize``; False si no es compatible."""
+        return self.replay.restore(self.bg, state, frame_bgr)
 
     def _postprocess_mask(self, fg):
         # quitar sombras (MOG2 usa 127 para sombras)
         _, mask = cv2.threshold(fg, 128, 255, cv2.THRESH_BINARY)
         # limpieza
         mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
-        if self.min_blob_area_px > 0:
-            num, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
-            if num > 1:
-                keep = np.zeros_like(mask)
-                for i in range(1, num):
-                    area = stats[i, cv2.CC_STAT_AREA]
-                    if area >= self.min_blob_area_px:
-                        keep[labels == i] = 255
-                mask = keep
+        mask = filter_small_blobs(mask, self.min_blob_area_px)
         return mask
 
     def step(self, frame_bgr, min_area_pct=0.001):
+        frame_bgr = as_context(frame_bgr).bgr
         fg = self.bg.apply(frame_bgr, learningRate=self.lr)
+        self.replay.push(frame_bgr)
         mask = self._postprocess_mask(fg)
-        active = float(np.count_nonzero(mask))
-        total  = float(mask.size)
-        frac   = active / max(1.0, total)
-        score  = max(frac, min_area_pct if frac >= min_area_pct else 0.0)
+        score = score_from_mask(mask, min_area_pct)
         return float(score), mask
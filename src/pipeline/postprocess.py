@@ -0,0 +1,37 @@
+import cv2
+import numpy as np
+
+
+def filter_small_blobs(mask, min_area_px, connectivity=8):
+    """
+    Descarta blobs con área < min_area_px en una sola pasada:
+      - connectedComponentsWithStats -> áreas por etiqueta
+      - tabla de consulta (LUT) etiqueta -> 0/255 aplicada una vez
+      - atajos sin copia para máscara vacía o cuando ningún blob debe eliminarse
+    """
+    if min_area_px <= 0 or cv2.countNonZero(mask) == 0:
+        return mask
+    num, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=connectivity)
+    if num <= 1:
+        return mask
+    keep = stats[:, cv2.CC_STAT_AREA] >= min_area_px
+    keep[0] = False
+    n_keep = int(np.count_nonzero(keep))
+    if n_keep == num - 1:
+        # nada que descartar: la máscara binaria ya es el resultado
+        return mask
+    if n_keep == 0:
+        return np.zeros_like(mask)
+    lut = np.where(keep, 255, 0).astype(np.uint8)
+    return lut[labels]
+
+
+def score_from_mask(mask, min_area_pct=0.001, area=None):
+    """
+    Fracción de pixeles activos de ``mask``:
+      - ``area`` permite medir contra una ROI en vez de todo el frame
+    """
+    active = float(cv2.countNonZero(mask))
+    total  = float(mask.size if area is None else area)
+    frac   = active / max(1.0, total)
+    return max(frac, min_area_pct if frac >= min_area_pct else 0.0)
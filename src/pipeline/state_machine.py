@@ -0,0 +1,115 @@
+import numpy as np
+
+
+class OperationStateMachine:
+    """
+    Histéresis OPERACION <-> IDLE con múltiples intervalos:
+      - IDLE -> OPERACION si el score suavizado >= up_threshold durante min_active_sec
+      - OPERACION -> IDLE si el score suavizado <= down_threshold durante idle_stop_sec
+      - los tiempos los provee un reloj externo (pared o media), no time.time()
+    """
+    def __init__(self, up_threshold, down_threshold, min_active_sec, idle_stop_sec, start_ts=0.0):
+        self.up_threshold = float(up_threshold)
+        self.down_threshold = float(down_threshold)
+        self.min_active_sec = float(min_active_sec)
+        self.idle_stop_sec = float(idle_stop_sec)
+        self.status = "IDLE"            # "IDLE" | "OPERACION"
+        self.last_state_ts = float(start_ts)
+        self.current_start = None
+
+    def update(self, score_s, now):
+        """Avanza la máquina; devuelve (inicio, fin) si se cerró un intervalo."""
+        if self.status == "IDLE":
+            if score_s >= self.up_threshold:
+                # Debe sostenerse por min_active_sec
+                if (now - self.last_state_ts) >= self.min_active_sec:
+                    self.status = "OPERACION"
+                    self.last_state_ts = now
+                    self.current_start = now
+            else:
+                # sigue en IDLE, refrescamos el temporizador
+                self.last_state_ts = now
+        else:  # OPERACION
+            if score_s <= self.down_threshold:
+                # Debe sostenerse inactivo por idle_stop_sec
+                if (now - self.last_state_ts) >= self.idle_stop_sec:
+                    interval = (self.current_start, now)
+                    self.status = "IDLE"
+                    self.last_state_ts = now
+                    self.current_start = None
+                    return interval
+            else:
+                # sigue en operacion, refrescar temporizador para idle
+                self.last_state_ts = now
+        return None
+
+    def close(self, now):
+        """Cierra el intervalo abierto al terminar la fuente (si lo hay)."""
+        if self.status == "OPERACION" and self.current_start is not None:
+            interval = (self.current_start, now)
+            self.status = "IDLE"
+            self.current_start = None
+            return interval
+        return None
+
+
+def _last_before(t, flags):
+    """Para cada i, el tiempo del último j < i con flags[j] (o -inf)."""
+    marked = np.where(flags, t, -np.inf)
+    out = np.empty_like(marked)
+    out[0] = -np.inf
+    np.maximum.accumulate(marked[:-1], out=out[1:])
+    return out
+
+
+def _first_true(cond_fn, start, n, chunk=4096):
+    """Primer índice >= start donde cond_fn(slice) es True, buscando en bloques crecientes."""
+    i = start
+    while i < n:
+        j = min(n, i + chunk)
+        hit = cond_fn(i, j)
+        if hit.any():
+            return i + int(np.argmax(hit))
+        i = j
+        chunk *= 2
+    return -1
+
+
+def replay_intervals(t, score_s, up_threshold, down_threshold, min_active_sec, idle_stop_sec,
+                     start_ts=0.0, close_at_end=True):
+    """
+    Versión vectorizada de ``OperationStateMachine`` sobre arreglos completos.
+
+    Devuelve la misma lista de intervalos (inicio, fin) que alimentar la máquina
+    frame a frame con ``update(score_s[i], t[i])`` y cerrar con ``close(t[-1])``;
+    el costo es O(N) más una búsqueda por cambio de estado.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    s = np.asarray(score_s, dtype=np.float64)
+    n = len(t)
+    if n == 0:
+        return []
+    last_below_up = _last_before(t, s < up_threshold)
+    last_above_down = _last_before(t, s > down_threshold)
+    above_up = s >= up_threshold
+    below_down = s <= down_threshold
+
+    intervals = []
+    entry, i = float(start_ts), 0
+    while i < n:
+        e = entry
+        i = _first_true(lambda a, b: above_up[a:b] & (t[a:b] - np.maximum(e, last_below_up[a:b]) >= min_active_sec),
+                        i, n)
+        if i < 0:
+            break
+        start = entry = float(t[i])
+        e = entry
+        j = _first_true(lambda a, b: below_down[a:b] & (t[a:b] - np.maximum(e, last_above_down[a:b]) >= idle_stop_sec),
+                        i + 1, n)
+        if j < 0:
+            if close_at_end:
+                intervals.append((start, float(t[-1])))
+            break
+        intervals.append((start, float(t[j])))
+        entry, i = float(t[j]), j + 1
+    return intervals
@@ -0,0 +1,118 @@
+"""Recompute intervals from cached score traces without decoding the video.
+
+``python -m src replay data/raw_videos --up_threshold 0.01 --idle_stop_sec 30``
+looks up the trace of every input (see :mod:`src.io.traces`) for the engine
+parameters given, applies the smoothing with :func:`~src.utils.smoothing.smooth_trace`
+and the hysteresis with :func:`~src.pipeline.state_machine.replay_intervals`,
+and writes the interval CSV.  Inputs without a trace are analysed once with
+the headless monitor (recording the trace) and then replayed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from .batch import expand_inputs
+from .cli import add_processing_arguments, effective_skip, iso, run_monitor, score_params
+from .io.recorders import CSVRecorder
+from .io.traces import fingerprint, load_trace, trace_key, trace_path
+from .pipeline.state_machine import replay_intervals
+from .utils.clock import parse_start_time
+from .utils.roi import load_roi
+from .utils.smoothing import smooth_trace
+
+
+def find_trace(path: str, args: argparse.Namespace):
+    """Cached trace of ``path`` for the engine parameters in ``args`` (or ``None``)."""
+    cap = cv2.VideoCapture(path)
+    fps_in = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    cap.release()
+    roi = load_roi(path, args.roi_config, args.roi, args.exclude)
+    key = trace_key(fingerprint(path), score_params(args, effective_skip(args, fps_in), roi))
+    return load_trace(trace_path(args.trace_dir, path, key))
+
+
+def ensure_trace(path: str, args: argparse.Namespace, compute: bool = True):
+    """Like :func:`find_trace`, analysing ``path`` once (headless) if it has no trace."""
+    name = os.path.basename(path)
+    found = find_trace(path, args)
+    if found is not None:
+        return found
+    if not compute:
+        print(f"[WARN] {name}: sin traza para estos parámetros; se omite.")
+        return None
+    print(f"[..] {name}: sin traza, analizando una vez...")
+    run_args = argparse.Namespace(**vars(args))
+    run_args.src = path
+    run_args.headless = True
+    run_args.out = ""
+    run_args.display_width = args.width
+    run_args.progress_sec = float("inf")
+    run_args.clock = "media"
+    run_args.capture_mode = "lossless"
+    run_args.state_dir = ""  # la traza se calcula siempre desde un modelo en frío
+    run_monitor(run_args, on_interval=lambda *iv: None, verbose=False)
+    found = find_trace(path, args)
+    if found is None:
+        print(f"[ERR] {name}: no se pudo generar la traza.")
+    return found
+
+
+def replay_one(trace, meta: dict, args: argparse.Namespace, origin: float):
+    """Intervals (epoch seconds) from one trace with the thresholds in ``args``."""
+    score_s = smooth_trace(args.smoother, trace["t"], trace["score"], args.smooth_k, args.smooth_sec)
+    t = np.asarray(trace["t"]) + origin
+    return replay_intervals(t, score_s, args.up_threshold, args.down_threshold,
+                            args.min_active_sec, args.idle_stop_sec, start_ts=origin + meta["t0"])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        prog="python -m src replay",
+        description="Recalcula los intervalos con otros umbrales a partir de las trazas de score guardadas.",
+    )
+    ap.add_argument("inputs", nargs="+", help="Videos, directorios o patrones glob ya analizados")
+    ap.add_argument("--no_compute", action="store_true",
+                    help="No analizar los videos sin traza (sólo avisar)")
+    add_processing_arguments(ap)
+    ap.set_defaults(csv="outputs/csv/operacion_replay.csv", trace_dir="outputs/traces")
+    return ap
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    if "," in args.engine:
+        raise SystemExit(f"--engine {args.engine}: las trazas son de un solo motor.")
+    videos = expand_inputs(args.inputs)
+    if not videos:
+        print("No se encontraron videos para reproducir.")
+        return
+    origin = parse_start_time(args.start_time) or time.time()
+
+    csv_rec = CSVRecorder(args.csv) if args.csv else None
+    total_frames = total = 0
+    t_replay = 0.0
+    for path in videos:
+        name = os.path.basename(path)
+        found = ensure_trace(path, args, compute=not args.no_compute)
+        if found is None:
+            continue
+        trace, meta = found
+        t_start = time.perf_counter()
+        intervals = replay_one(trace, meta, args, origin)
+        t_replay += time.perf_counter() - t_start
+        total_frames += len(trace)
+        total += len(intervals)
+        for start_ts, end_ts in intervals:
+            if csv_rec:
+                csv_rec.append_interval(path, start_ts, end_ts)
+            print(f"[OK] {name}: {iso(start_ts)} -> {iso(end_ts)}  ({end_ts-start_ts:.1f}s)")
+
+    print(f"[OK] Replay: {total} intervalos de {total_frames} frames en {1000.0 * t_replay:.1f} ms.")
+    if csv_rec:
+        print(f"[OK] CSV: {args.csv}")
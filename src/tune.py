@@ -0,0 +1,239 @@
+"""Search the hysteresis parameters against hand-labelled intervals.
+
+``python -m src tune data/ref/*.mp4 --gt labels.csv --start_time 2026-01-01T08:00:00``
+loads (or records once) the score trace of every input for the engine given,
+then evaluates combinations of ``--up_threshold``, ``--down_threshold``,
+``--smooth_k``, ``--idle_stop_sec`` and ``--min_active_sec`` on a process pool.
+Each evaluation is a :func:`~src.pipeline.state_machine.replay_intervals` call
+over the cached arrays (smoothing is computed once per window size and
+worker), so no frame is decoded during the search.  With ``--smooth_sec``
+the smoothing window is fixed in seconds and ``--k`` is not searched.
+
+The ground truth uses the :class:`~src.io.recorders.CSVRecorder` format; its
+timestamps must share the ``--start_time`` anchor of the traces.  Reported
+metrics, aggregated over all inputs:
+
+``iou``        time-weighted IoU between predicted and labelled OPERACION
+``bound_err``  mean absolute start/end error (s) of labelled intervals that were detected
+``false``      predicted intervals that overlap no labelled interval
+``missed``     labelled intervals with no overlapping prediction
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import multiprocessing as mp
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from .batch import expand_inputs
+from .pipeline.state_machine import replay_intervals
+from .replay import build_parser as build_replay_parser, ensure_trace
+from .utils.clock import parse_start_time
+from .utils.smoothing import smooth_trace
+
+PARAMS = ("up_threshold", "down_threshold", "smooth_k", "idle_stop_sec", "min_active_sec")
+
+
+def parse_space(text: str, cast=float):
+    """``"lo:hi:n"`` (n values, linspace), ``"a,b,c"`` or a single value."""
+    if ":" in text:
+        lo, hi, n = text.split(":")
+        return ("range", cast(lo), cast(hi), int(n))
+    return ("list", [cast(v) for v in text.split(",") if v.strip()])
+
+
+def space_values(space, cast=float):
+    if space[0] == "list":
+        return space[1]
+    _, lo, hi, n = space
+    return sorted({cast(v) for v in np.linspace(lo, hi, n)})
+
+
+def space_sample(space, rng, cast=float):
+    if space[0] == "list":
+        return cast(rng.choice(space[1]))
+    _, lo, hi, _ = space
+    return cast(round(rng.uniform(lo, hi))) if cast is int else cast(rng.uniform(lo, hi))
+
+
+def load_ground_truth(path: str) -> dict:
+    """``{basename: [(start, end), ...]}`` from a CSV written by ``CSVRecorder``."""
+    gt = defaultdict(list)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            start = datetime.fromisoformat(row["inicio_iso"]).timestamp()
+            end = datetime.fromisoformat(row["fin_iso"]).timestamp()
+            gt[row["archivo"]].append((start, end))
+    return {k: sorted(v) for k, v in gt.items()}
+
+
+def _active(t, intervals) -> np.ndarray:
+    """Per-frame boolean: frame time inside any ``[start, end)``."""
+    edges = np.zeros(len(t) + 1, np.int32)
+    for start, end in intervals:
+        edges[np.searchsorted(t, start)] += 1
+        edges[np.searchsorted(t, end)] -= 1
+    return np.cumsum(edges[:-1]) > 0
+
+
+def evaluate(t, dt, gt_active, gt, pred):
+    """``(intersección, unión, suma de errores, bordes, falsos, perdidos)`` en segundos."""
+    pred_active = _active(t, pred)
+    inter = float(dt[pred_active & gt_active].sum())
+    union = float(dt[pred_active | gt_active].sum())
+    err, n_bound, missed = 0.0, 0, 0
+    for g0, g1 in gt:
+        hits = [(p0, p1) for p0, p1 in pred if p0 < g1 and p1 > g0]
+        if not hits:
+            missed += 1
+            continue
+        err += abs(hits[0][0] - g0) + abs(hits[-1][1] - g1)
+        n_bound += 2
+    false = sum(1 for p0, p1 in pred if not any(p0 < g1 and p1 > g0 for g0, g1 in gt))
+    return inter, union, err, n_bound, false, missed
+
+
+_DATA = []
+_SMOOTHED = {}
+_SMOOTHER = "sma"
+_SMOOTH_SEC = 0.0
+
+
+def _init_worker(data, smoother, smooth_sec=0.0) -> None:
+    global _DATA, _SMOOTHER, _SMOOTH_SEC
+    _DATA = data
+    _SMOOTHER = smoother
+    _SMOOTH_SEC = smooth_sec
+    _SMOOTHED.clear()
+
+
+def _smoothed(i, k):
+    key = (i, k)
+    if key not in _SMOOTHED:
+        d = _DATA[i]
+        _SMOOTHED[key] = smooth_trace(_SMOOTHER, d["t"], d["score"], k, _SMOOTH_SEC)
+    return _SMOOTHED[key]
+
+
+def _evaluate_chunk(combos):
+    out = []
+    for up, down, k, idle, min_active in combos:
+        tot = np.zeros(6)
+        for i, d in enumerate(_DATA):
+            pred = replay_intervals(d["t"], _smoothed(i, k), up, down, min_active, idle,
+                                    start_ts=d["start_ts"])
+            tot += evaluate(d["t"], d["dt"], d["gt_active"], d["gt"], pred)
+        inter, union, err, n_bound, false, missed = tot
+        out.append({"up_threshold": up, "down_threshold": down, "smooth_k": k,
+                    "idle_stop_sec": idle, "min_active_sec": min_active,
+                    "iou": inter / union if union > 0 else 1.0,
+                    "bound_err": err / n_bound if n_bound else float("nan"),
+                    "false": int(false), "missed": int(missed)})
+    return out
+
+
+def build_combos(args) -> list:
+    spaces = [parse_space(args.up), parse_space(args.down), parse_space(args.k, int),
+              parse_space(args.idle), parse_space(args.min_active)]
+    casts = (float, float, int, float, float)
+    if args.search == "grid":
+        combos = itertools.product(*(space_values(s, c) for s, c in zip(spaces, casts)))
+    else:
+        rng = np.random.default_rng(args.seed)
+        combos = (tuple(space_sample(s, rng, c) for s, c in zip(spaces, casts)) for _ in range(args.samples))
+    return [c for c in combos if c[1] <= c[0] and c[2] >= 1]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = build_replay_parser()
+    ap.prog = "python -m src tune"
+    ap.description = "Busca umbrales y tiempos de histéresis que mejor reproducen intervalos etiquetados."
+    ap.add_argument("--gt", required=True, help="CSV de intervalos reales (formato de CSVRecorder)")
+    ap.add_argument("--search", choices=["grid", "random"], default="grid")
+    ap.add_argument("--samples", type=int, default=20000, help="Combinaciones en búsqueda aleatoria")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--up", default="0.002:0.03:15", help="Espacio de --up_threshold: 'min:max:n' o 'a,b,c'")
+    ap.add_argument("--down", default="0.001:0.02:10", help="Espacio de --down_threshold")
+    ap.add_argument("--k", default="1,4,8,16", help="Espacio de --smooth_k")
+    ap.add_argument("--idle", default="5:60:12", help="Espacio de --idle_stop_sec")
+    ap.add_argument("--min_active", default="", help="Espacio de --min_active_sec (por defecto el valor fijo)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos de evaluación")
+    ap.add_argument("--top", type=int, default=10, help="Mejores configuraciones a mostrar")
+    ap.add_argument("--results", default="", help="CSV con todas las combinaciones evaluadas")
+    return ap
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    if "," in args.engine:
+        raise SystemExit(f"--engine {args.engine}: las trazas son de un solo motor.")
+    if not args.start_time:
+        raise SystemExit("--start_time es obligatorio: ancla las trazas a las horas del CSV de referencia.")
+    if not args.min_active:
+        args.min_active = str(args.min_active_sec)
+    if args.smooth_sec > 0:
+        # la ventana es fija en segundos: --k no cambiaría el resultado
+        args.k = str(args.smooth_k)
+    origin = parse_start_time(args.start_time)
+    gt_all = load_ground_truth(args.gt)
+
+    data = []
+    for path in expand_inputs(args.inputs):
+        name = os.path.basename(path)
+        if name not in gt_all:
+            print(f"[WARN] {name}: sin intervalos en {args.gt}; se omite.")
+            continue
+        found = ensure_trace(path, args, compute=not args.no_compute)
+        if found is None:
+            continue
+        trace, meta = found
+        t = np.asarray(trace["t"], np.float64) + origin
+        dt = np.diff(t, append=t[-1] + (np.median(np.diff(t)) if len(t) > 1 else 0.0))
+        data.append({"t": t, "dt": dt, "score": np.asarray(trace["score"]),
+                     "gt": gt_all[name], "gt_active": _active(t, gt_all[name]),
+                     "start_ts": origin + meta["t0"]})
+    if not data:
+        print("No hay videos con traza e intervalos de referencia.")
+        return
+
+    combos = build_combos(args)
+    workers = max(1, min(args.workers, len(combos)))
+    chunks = [combos[i::workers * 8] for i in range(workers * 8)]
+    print(f"[OK] {len(combos)} combinaciones sobre {len(data)} videos "
+          f"({sum(len(d['t']) for d in data)} frames) con {workers} procesos.")
+    t0 = time.time()
+    results = []
+    with mp.Pool(workers, initializer=_init_worker, initargs=(data, args.smoother, args.smooth_sec)) as pool:
+        for part in pool.imap_unordered(_evaluate_chunk, [c for c in chunks if c]):
+            results.extend(part)
+    elapsed = time.time() - t0
+    results.sort(key=lambda r: (-r["iou"], r["false"], r["missed"], np.nan_to_num(r["bound_err"], nan=1e9)))
+
+    print(f"[OK] Búsqueda terminada en {elapsed:.2f}s ({len(results) / max(1e-6, elapsed):.0f} comb/s).")
+    print(f"{'iou':>6} {'err_s':>7} {'falsos':>6} {'perd':>5}  " + "  ".join(PARAMS))
+    for r in results[:args.top]:
+        print(f"{r['iou']:6.3f} {r['bound_err']:7.2f} {r['false']:6d} {r['missed']:5d}  "
+              f"{r['up_threshold']:.4f}  {r['down_threshold']:.4f}  {r['smooth_k']}  "
+              f"{r['idle_stop_sec']:.1f}  {r['min_active_sec']:.2f}")
+    if results:
+        best = results[0]
+        line = " ".join(f"--{p} {best[p]:g}" for p in PARAMS)
+        if args.smooth_sec > 0:
+            line += f" --smooth_sec {args.smooth_sec:g}"
+        print("[OK] Mejor: " + line)
+    if args.results:
+        d = os.path.dirname(args.results)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(args.results, "w", encoding="utf-8", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=[*PARAMS, "iou", "bound_err", "false", "missed"])
+            w.writeheader()
+            w.writerows(results)
+        print(f"[OK] Resultados: {args.results}")
@@ -0,0 +1,63 @@
+"""State-driven analysis rate.
+
+:class:`AdaptiveRate` switches a source between two modes:
+
+``"full"``
+    the configured ``--skip``/``--analysis_fps`` and analysis width.
+``"idle"``
+    a lower analysis FPS and width, entered after the station has been IDLE
+    with a score below the wake threshold for ``idle_after_sec`` (clock
+    seconds, so it works with media and wall clocks alike).
+
+It returns to ``"full"`` on the first frame whose raw or smoothed score
+reaches the wake threshold (``--down_threshold`` by default, i.e. the score
+is nearing ``--up_threshold``) and it never leaves ``"full"`` while the
+state machine is in OPERACION, so interval ends are always measured at full
+rate.  The monitor does not feed idle-rate scores to the state machine
+either, so interval starts (and ``--min_active_sec``) are decided at full
+rate from the wake-up frame on.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+
+class AdaptiveRate:
+    """Two-level rate controller fed once per analysed frame."""
+
+    def __init__(self, full_skip: int, idle_skip: int, idle_after_sec: float,
+                 wake_threshold: float) -> None:
+        self.full_skip = max(1, int(full_skip))
+        self.idle_skip = max(self.full_skip, int(idle_skip))
+        self.idle_after_sec = float(idle_after_sec)
+        self.wake_threshold = float(wake_threshold)
+        self.mode = "full"
+        self.quiet_since: Optional[float] = None
+        self.switches = 0
+        self.frames = {"full": 0, "idle": 0}
+
+    @property
+    def skip(self) -> int:
+        return self.idle_skip if self.mode == "idle" else self.full_skip
+
+    def update(self, status: str, score: float, score_s: float, ts: float) -> bool:
+        """Account for one analysed frame; ``True`` if the mode changed."""
+        self.frames[self.mode] += 1
+        hot = status != "IDLE" or max(score, score_s) >= self.wake_threshold
+        if self.mode == "idle":
+            if hot:
+                self.mode = "full"
+                self.quiet_since = None
+                self.switches += 1
+                return True
+            return False
+        if hot:
+            self.quiet_since = None
+        elif self.quiet_since is None:
+            self.quiet_since = ts
+        elif ts - self.quiet_since >= self.idle_after_sec:
+            self.mode = "idle"
+            self.switches += 1
+            return True
+        return False
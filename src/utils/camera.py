@@ -2,27 +2,79 @@
 
 from __future__ import annotations
 
+import queue
 import threading
 import time
 from collections import deque
-from typing import Deque, Optional, Tuple
+from typing import Callable, Deque, Optional, Tuple
 
 import cv2
 
+Frame = Tuple[int, float, cv2.typing.MatLike]
+
 
 class FrameReader:
     """Continuously pull frames from a ``cv2.VideoCapture`` in a background thread.
 
     ``VideoCapture.read`` is a blocking call and, depending on the backend,
     introduces noticeable latency. ``FrameReader`` mitigates this by polling
-    the capture on a separate daemon thread and keeping only the most recent
-    frame in a bounded deque.  The consumer can then call :meth:`read_latest`
-    to obtain the freshest frame available without waiting for I/O.
+    the capture on a separate daemon thread so decoding overlaps with the
+    consumer's work.  Two modes are available:
+
+    ``"latest"`` (live cameras)
+        Only the most recent frame is kept in a bounded deque.  The consumer
+        calls :meth:`read_latest` or :meth:`read_next` to obtain the freshest
+        frame available without waiting for I/O; stale frames are dropped.
+    ``"lossless"`` (files)
+        Every ``skip``-th frame is pushed into a bounded queue.  When the
+        queue is full the capture thread blocks (backpressure), so no frame
+        is lost and memory stays bounded.
+
+    Each captured frame gets a sequence number (its index in the source,
+    counting frames read before :meth:`start` via ``first_seq``) and a
+    timestamp from the optional ``clock`` (see :mod:`src.utils.clock`).  When
+    the source is exhausted the reader signals end-of-stream instead of
+    polling: :meth:`read` returns ``None`` and :attr:`eos` is set.
+
+    A live source that fails ``max_failures`` reads in a row ends the stream
+    unless ``reopen`` is given: then the capture is released and
+    ``reopen()`` is retried with exponential backoff (up to
+    ``reopen_max_sec`` between attempts) until it yields an opened capture
+    or the reader is stopped.  :attr:`lost` is set while reconnecting and
+    :attr:`reconnects` counts the successful reopens.
+
+    Frames that ``skip`` discards are never converted to BGR: they are only
+    ``grab()``-ed.  For seekable sources, gaps of at least ``seek_min_skip``
+    frames are jumped over with ``CAP_PROP_POS_FRAMES`` so they are not even
+    decoded (``0`` disables seeking).
     """
 
-    def __init__(self, cap: cv2.VideoCapture, maxlen: int = 1) -> None:
+    def __init__(self, cap: cv2.VideoCapture, maxlen: int = 1, clock=None,
+                 mode: str = "latest", skip: int = 1, first_seq: int = 0,
+                 max_failures: int = 100, seek_min_skip: int = 0,
+                 reopen: Optional[Callable[[], cv2.VideoCapture]] = None,
+                 reopen_max_sec: float = 30.0) -> None:
+        if mode not in ("latest", "lossless"):
+            raise ValueError(f"Modo de captura desconocido: {mode}")
         self.cap = cap
+        self.clock = clock
+        self.mode = mode
+        self.skip = max(1, int(skip))
+        self.max_failures = max_failures
+        self.reopen = reopen
+        self.reopen_max_sec = max(0.1, float(reopen_max_sec))
+        self.lost = False
+        self.reconnects = 0
+        self.seek_min_skip = max(0, int(seek_min_skip))
+        self.grabbed = 0
+        self.seeks = 0
         self.queue: Deque = deque(maxlen=maxlen)
+        self.frames: "queue.Queue[Optional[Frame]]" = queue.Queue(maxsize=max(1, maxlen))
+        self.seq = first_seq
+        self._latest: Optional[Frame] = None
+        self._last_read = 0
+        self._cond = threading.Condition()
+        self.eos = threading.Event()
         self.stop_flag = threading.Event()
         self.thread = threading.Thread(target=self._loop, daemon=True)
 
@@ -33,12 +85,105 @@ class FrameReader:
         return self
 
     def _loop(self) -> None:
+        failures = 0
         while not self.stop_flag.is_set():
-            ret, frame = self.cap.read()
+            nxt = self.seq + 1
+            gap = (self.skip - (nxt - 1) % self.skip) % self.skip
+            if gap and self.seek_min_skip and gap >= self.seek_min_skip \
+                    and self.cap.set(cv2.CAP_PROP_POS_FRAMES, nxt + gap):
+                self.seeks += 1
+                self.seq = nxt + gap - 1
+                continue
+            if gap:
+                ret, frame = self.cap.grab(), None
+            else:
+                ret, frame = self.cap.read()
             if not ret:
-                time.sleep(0.005)
+                failures += 1
+                # Un archivo terminado no se recupera; una cámara puede fallar puntualmente.
+                if self.mode == "lossless":
+                    break
+                if failures >= self.max_failures:
+                    if self.reopen is None or not self._reconnect():
+                        break
+                    failures = 0
+                    continue
+                self.stop_flag.wait(0.005)
                 continue
-            self.queue.append(frame)
+            failures = 0
+            self.seq += 1
+            if gap:
+                self.grabbed += 1
+                continue
+            ts = self.clock.stamp(self.cap, self.seq) if self.clock is not None else time.time()
+            item = (self.seq, ts, frame)
+            if self.mode == "lossless":
+                if not self._put(item):
+                    break
+            else:
+                with self._cond:
+                    self._latest = item
+                    self.queue.append(frame)
+                    self._cond.notify_all()
+        self._signal_eos()
+
+    def _reconnect(self) -> bool:
+        """Reopen a lost live source with backoff; ``False`` once the reader is stopped."""
+        self.lost = True
+        self.cap.release()
+        delay = 0.5
+        while not self.stop_flag.wait(delay):
+            try:
+                cap = self.reopen()
+            except Exception:  # un backend caído no debe matar el hilo de captura
+                cap = None
+            if cap is not None and cap.isOpened():
+                self.cap = cap
+                self.lost = False
+                self.reconnects += 1
+                return True
+            if cap is not None:
+                cap.release()
+            delay = min(self.reopen_max_sec, delay * 2)
+        return False
+
+    def _put(self, item) -> bool:
+        while not self.stop_flag.is_set():
+            try:
+                self.frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _signal_eos(self) -> None:
+        self.eos.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self.mode == "lossless":
+            self._put(None)
+
+    def read(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        """Block until the next frame is available; ``None`` means end-of-stream.
+
+        In ``"latest"`` mode this waits for a frame newer than the previous
+        one returned, skipping whatever was overwritten in between.
+        """
+        if self.mode == "lossless":
+            try:
+                return self.frames.get(timeout=timeout)
+            except queue.Empty:
+                return None
+        last = self._last_read
+        with self._cond:
+            ok = self._cond.wait_for(
+                lambda: (self._latest is not None and self._latest[0] > last) or self.eos.is_set(),
+                timeout=timeout,
+            )
+            if not ok or self._latest is None or self._latest[0] <= last:
+                return None
+            self._last_read = self._latest[0]
+            return self._latest
 
     def read_latest(self) -> Tuple[bool, Optional[cv2.typing.MatLike]]:
         """Return the most recently captured frame if available."""
@@ -46,6 +191,13 @@ class FrameReader:
             return True, self.queue[-1]
         return False, None
 
+    def read_next(self, after_seq: int = 0) -> Optional[Frame]:
+        """Return ``(seq, ts, frame)`` if a frame newer than ``after_seq`` exists."""
+        latest = self._latest
+        if latest is None or latest[0] <= after_seq:
+            return None
+        return latest
+
     def stop(self, timeout: float = 1.0) -> None:
         """Stop the background thread and wait for it to finish."""
         self.stop_flag.set()
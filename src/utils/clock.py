@@ -0,0 +1,106 @@
+"""Timestamp sources for the OPERACION/IDLE state machine.
+
+Live cameras are timed with the wall clock, while recorded files are timed
+with their own media timeline so interval boundaries do not depend on how
+fast (or slow) the file is processed.  Every clock exposes :meth:`stamp`,
+which must be called right after a frame is read and returns an epoch-like
+timestamp in seconds that can be fed to :class:`datetime.fromtimestamp`.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import time
+from datetime import datetime
+from typing import Optional
+
+import cv2
+
+
+class WallClock:
+    """Stamp frames with ``time.time()`` (live sources)."""
+
+    kind = "wall"
+
+    def __init__(self) -> None:
+        self.origin = time.time()
+
+    def stamp(self, cap: Optional[cv2.VideoCapture], frame_idx: int) -> float:
+        return time.time()
+
+
+class MediaClock:
+    """Stamp frames with their position on the media timeline.
+
+    ``CAP_PROP_POS_MSEC`` is used when the backend reports it; otherwise the
+    timestamp falls back to ``frame_idx / fps``.  The result is offset by
+    ``origin`` (epoch seconds) so the CSV keeps absolute ISO timestamps while
+    durations are measured in media time.
+    """
+
+    kind = "media"
+
+    def __init__(self, fps: float, origin: Optional[float] = None) -> None:
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.origin = time.time() if origin is None else float(origin)
+        self._last = 0.0
+
+    def media_sec(self, cap: Optional[cv2.VideoCapture], frame_idx: int) -> float:
+        pos_ms = cap.get(cv2.CAP_PROP_POS_MSEC) if cap is not None else 0.0
+        if pos_ms and pos_ms > 0:
+            t = pos_ms / 1000.0
+        else:
+            t = frame_idx / self.fps
+        # algunos backends devuelven saltos hacia atrás tras un seek
+        self._last = max(self._last, t)
+        return self._last
+
+    def stamp(self, cap: Optional[cv2.VideoCapture], frame_idx: int) -> float:
+        return self.origin + self.media_sec(cap, frame_idx)
+
+
+def parse_start_time(value: str) -> Optional[float]:
+    """Convert an ISO-8601 string (``--start_time``) into epoch seconds."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value).timestamp()
+
+
+# ``2026-01-01_0800``, ``20260101_080000``, ``2026-01-01T08-00-00``...
+_NAME_STAMP = re.compile(r"(?<!\d)(\d{4})-?(\d{2})-?(\d{2})[ _T-]?(\d{2})[-:h]?(\d{2})(?:[-:m]?(\d{2}))?(?!\d)")
+
+
+def name_timestamp(path: str) -> Optional[float]:
+    """Epoch seconds of a date-time stamp in the file name (local time), if any."""
+    m = _NAME_STAMP.search(os.path.basename(path))
+    if m is None:
+        return None
+    try:
+        return datetime(*(int(g) if g else 0 for g in m.groups())).timestamp()
+    except ValueError:
+        return None
+
+
+def file_origin(path: str) -> float:
+    """Recording start of a file: the stamp in its name, otherwise its mtime minus its duration."""
+    ts = name_timestamp(path)
+    if ts is not None:
+        return ts
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    frames = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0.0
+    cap.release()
+    duration = frames / fps if fps > 0 else 0.0
+    return os.path.getmtime(path) - duration
+
+
+def make_clock(source, fps: float, mode: str = "auto", origin: Optional[float] = None):
+    """Pick the clock for *source*: media time for files, wall time otherwise."""
+    if mode == "wall":
+        return WallClock()
+    if mode == "media":
+        return MediaClock(fps, origin)
+    if isinstance(source, str) and os.path.isfile(source):
+        return MediaClock(fps, origin)
+    return WallClock()
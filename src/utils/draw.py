@@ -1,3 +1,5 @@
+import threading
+
 import cv2
 import numpy as np
 
@@ -5,38 +7,112 @@ def put_text(img, text, org, scale=0.8, color=(255,255,255), thick=2):
     cv2.putText(img, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, (0,0,0), thick+2, cv2.LINE_AA)
     cv2.putText(img, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thick, cv2.LINE_AA)
 
+# Buffers reutilizados entre frames. Son por hilo porque ``multi`` dibuja varias
+# cámaras a la vez desde el pool de análisis.
+_local = threading.local()
+_BANNER_H = 48
+_GRAPH_H, _GRAPH_W = 64, 240
+
+
+def _cache():
+    c = getattr(_local, "cache", None)
+    if c is None:
+        c = _local.cache = {}
+    return c
+
+
 def draw_status_banner(img, status, score, up_thr, down_thr, fps_est):
-    h, w = img.shape[:2]
-    bar_h = 48
-    overlay = img.copy()
+    """Banner semitransparente: sólo se mezcla la franja superior, no el frame completo."""
+    w = img.shape[1]
     color = (0,170,0) if status == "OPERACION" else (60,60,200)
-    cv2.rectangle(overlay, (0,0), (w, bar_h), color, -1)
-    cv2.addWeighted(overlay, 0.55, img, 0.45, 0, img)
+    key = ("banner", w, img.shape[2], color)
+    cache = _cache()
+    bar = cache.get(key)
+    if bar is None:
+        bar = cache[key] = np.full((_BANNER_H+1, w, img.shape[2]), color, img.dtype)
+    top = img[:_BANNER_H+1]  # el rectángulo original incluye la fila _BANNER_H
+    cv2.addWeighted(bar, 0.55, top, 0.45, 0, top)
     put_text(img, f"Estado: {'EN OPERACION' if status=='OPERACION' else 'IDLE'}",
              (10, 32), 0.8, (255,255,255), 2)
     put_text(img, f"Score:{score:.3f} Up:{up_thr:.3f} Down:{down_thr:.3f} FPS:{fps_est:.1f}",
-             (10, bar_h+26), 0.6, (255,255,0), 2)
+             (10, _BANNER_H+26), 0.6, (255,255,0), 2)
+
+
+class ScoreRing:
+    """Historial de scores de tamaño fijo (búfer circular, sin asignaciones por frame)."""
+
+    def __init__(self, size):
+        self.size = max(2, int(size))
+        self.buf = np.zeros(self.size, np.float32)
+        self.n = 0
+
+    def __len__(self):
+        return min(self.n, self.size)
+
+    def append(self, value):
+        self.buf[self.n % self.size] = value
+        self.n += 1
+
+    def values(self):
+        """Copia en orden cronológico (segura para pasarla a otro hilo)."""
+        if self.n <= self.size:
+            return self.buf[:self.n].copy()
+        i = self.n % self.size
+        return np.concatenate((self.buf[i:], self.buf[:i]))
+
 
 def draw_small_graph(img, values, title="score"):
-    gh, gw = 64, 240
-    x0, y0 = img.shape[1]-gw-10, 10
-    g = np.zeros((gh, gw, 3), np.uint8)
-    if len(values) > 1:
-        v = np.clip(np.array(values, dtype=np.float32), 0, 1.0)
-        xs = np.linspace(8, gw-8, len(v)).astype(int)
-        ys = (1.0 - v) * (gh-12) + 6
-        pts = np.stack([xs, ys.astype(int)], axis=1)
-        for i in range(1, len(pts)):
-            cv2.line(g, tuple(pts[i-1]), tuple(pts[i]), (0,255,0), 2)
-    cv2.rectangle(g, (0,0), (gw-1, gh-1), (100,100,100), 1)
+    """Curva del score en una sola llamada a ``cv2.polylines`` (acepta lista, deque o arreglo)."""
+    x0, y0 = img.shape[1]-_GRAPH_W-10, 10
+    g = img[y0:y0+_GRAPH_H, x0:x0+_GRAPH_W]
+    g[:] = 0
+    n = len(values)
+    if n > 1:
+        v = np.clip(np.asarray(values, dtype=np.float32), 0, 1.0)
+        pts = np.empty((n, 2), np.int32)
+        pts[:, 0] = np.linspace(8, _GRAPH_W-8, n)
+        pts[:, 1] = (1.0 - v) * (_GRAPH_H-12) + 6
+        cv2.polylines(g, [pts], False, (0,255,0), 2)
+    cv2.rectangle(g, (0,0), (_GRAPH_W-1, _GRAPH_H-1), (100,100,100), 1)
     put_text(g, title, (6,18), 0.6, (200,200,200), 1)
-    img[y0:y0+gh, x0:x0+gw] = g
+
 
 def draw_mini_mask(img, mask, bottom_left, scale=0.25):
-    mini = cv2.resize(mask, (0,0), fx=scale, fy=scale)
-    mini = cv2.cvtColor(mini, cv2.COLOR_GRAY2BGR)
-    hm, wm = mini.shape[:2]
+    """Vista previa de la máscara; los buffers de resize/color se reutilizan entre frames."""
+    hm = int(round(mask.shape[0] * scale))
+    wm = int(round(mask.shape[1] * scale))
+    key = ("mini", hm, wm)
+    cache = _cache()
+    bufs = cache.get(key)
+    if bufs is None:
+        bufs = cache[key] = (np.empty((hm, wm), np.uint8), np.empty((hm, wm, 3), np.uint8))
+    mini, mini_bgr = bufs
+    cv2.resize(mask, (0, 0), dst=mini, fx=scale, fy=scale)
+    cv2.cvtColor(mini, cv2.COLOR_GRAY2BGR, dst=mini_bgr)
     x = bottom_left[0]
     y = bottom_left[1] - hm
-    img[y:y+hm, x:x+wm] = mini
+    img[y:y+hm, x:x+wm] = mini_bgr
     put_text(img, "mask", (x+2, y-4), 0.5, (200,200,200), 1)
+
+def draw_timing(img, stats, origin=(10, 110)):
+    """Latencias por etapa (p50/p95/p99 en ms) bajo el banner, en columnas fijas."""
+    x, y = origin
+    cols = (x, x + 90, x + 140, x + 190)
+    for cx, text in zip(cols, ("etapa", "p50", "p95", "p99")):
+        put_text(img, text, (cx, y), 0.45, (200,200,200), 1)
+    for name, st in stats.items():
+        y += 16
+        put_text(img, name[:11], (cols[0], y), 0.45, (200,255,200), 1)
+        for cx, key in zip(cols[1:], ("p50_ms", "p95_ms", "p99_ms")):
+            put_text(img, f"{st[key]:.2f}", (cx, y), 0.45, (200,255,200), 1)
+
+
+def draw_engine_rows(img, rows):
+    """Score suavizado y estado de cada motor (``--engine a,b,...``) bajo la gráfica, en columnas fijas."""
+    x, y = img.shape[1] - _GRAPH_W - 10, _GRAPH_H + 30
+    for name, status, score in rows:
+        color = (0,220,0) if status == "OPERACION" else (200,200,200)
+        put_text(img, name[:9], (x, y), 0.5, color, 1)
+        put_text(img, f"{score:.3f}", (x + 90, y), 0.5, color, 1)
+        put_text(img, "OPER" if status == "OPERACION" else "IDLE", (x + 160, y), 0.5, color, 1)
+        y += 18
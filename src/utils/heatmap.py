@@ -0,0 +1,92 @@
+"""Per-cell activity on a fixed grid and a session heatmap.
+
+Each frame's motion mask is reduced to a ``rows`` x ``cols`` array of active
+fractions with one ``cv2.integral`` pass plus four vectorised corner lookups
+(O(cells) after the integral), so the cost stays far below a millisecond at
+analysis resolution.  The fractions are accumulated in place into a float32
+buffer; :meth:`ActivityGrid.save` writes the session mean as ``.npy`` and as
+a colour PNG blended over a reference frame, which is what we use to place
+ROIs without rerunning the footage.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def parse_grid(text: str) -> Tuple[int, int]:
+    """``"8x12"`` -> ``(8, 12)`` (rows x cols)."""
+    rows, cols = (int(v) for v in text.lower().split("x"))
+    if rows < 1 or cols < 1:
+        raise ValueError(f"Rejilla inválida: {text!r}")
+    return rows, cols
+
+
+class ActivityGrid:
+    """Grid-cell active fractions from binary masks and their running sum."""
+
+    def __init__(self, rows: int, cols: int) -> None:
+        self.rows = int(rows)
+        self.cols = int(cols)
+        self.heat = np.zeros((self.rows, self.cols), np.float32)
+        self.last = np.zeros((self.rows, self.cols), np.float32)
+        self.frames = 0
+        self.shape = None
+        self.background = None
+        self._ys = self._xs = None
+        self._inv_area = None
+
+    def bind(self, h: int, w: int, background=None) -> "ActivityGrid":
+        """Fix the mask size; ``background`` (BGR) is used for the PNG overlay."""
+        self.shape = (h, w)
+        self._ys = np.linspace(0, h, self.rows + 1).astype(np.intp)
+        self._xs = np.linspace(0, w, self.cols + 1).astype(np.intp)
+        area = np.outer(np.diff(self._ys), np.diff(self._xs)).astype(np.float32)
+        self._inv_area = 1.0 / (255.0 * np.maximum(area, 1.0))
+        if background is not None:
+            self.background = background.copy()
+        return self
+
+    def update(self, mask) -> np.ndarray:
+        """Active fraction per cell for ``mask`` (0/255); also added to the heatmap."""
+        if self.shape is None:
+            self.bind(*mask.shape[:2])
+        ii = cv2.integral(mask)
+        s = ii[np.ix_(self._ys, self._xs)]
+        cells = s[1:, 1:] - s[:-1, 1:] - s[1:, :-1] + s[:-1, :-1]
+        np.multiply(cells, self._inv_area, out=self.last, casting="unsafe")
+        np.add(self.heat, self.last, out=self.heat)
+        self.frames += 1
+        return self.last
+
+    def mean(self) -> np.ndarray:
+        return self.heat / max(1, self.frames)
+
+    def render(self, size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """Colour heatmap (JET, normalised to the hottest cell) at ``size`` = (w, h)."""
+        h, w = self.shape
+        if size is None:
+            size = (w, h)
+        mean = self.mean()
+        peak = float(mean.max())
+        norm = (mean / peak * 255.0) if peak > 0 else mean
+        cells = cv2.resize(norm.astype(np.uint8), size, interpolation=cv2.INTER_NEAREST)
+        color = cv2.applyColorMap(cells, cv2.COLORMAP_JET)
+        if self.background is not None:
+            bg = cv2.resize(self.background, size)
+            color = cv2.addWeighted(bg, 0.5, color, 0.5, 0)
+        return color
+
+    def save(self, prefix: str) -> Tuple[str, str]:
+        """Write ``<prefix>.npy`` (mean fraction per cell) and ``<prefix>.png``."""
+        d = os.path.dirname(prefix)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        npy_path, png_path = prefix + ".npy", prefix + ".png"
+        np.save(npy_path, self.mean())
+        cv2.imwrite(png_path, self.render())
+        return npy_path, png_path
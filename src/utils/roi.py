@@ -0,0 +1,133 @@
+"""Static include/exclude regions (ROI) per source.
+
+Polygons are given either on the command line (``--roi``/``--exclude`` as
+``"x1,y1;x2,y2;..."``) or in a JSON file (``--roi_config``) keyed by source::
+
+    {
+      "default":  {"include": [[[0.1, 0.2], [0.6, 0.2], [0.6, 0.9], [0.1, 0.9]]]},
+      "cam_0":    {"include": [...], "exclude": [[[0.3, 0.3], [0.4, 0.3], [0.4, 0.5]]]},
+      "linea3.mp4": {"units": "px", "include": [[[120, 80], [900, 80], [900, 700], [120, 700]]]}
+    }
+
+Coordinates are normalised to the frame (0-1) unless ``"units": "px"``, in
+which case they are pixels of the original source.  The engines only see the
+bounding box of the include region; the polygon mask is applied to their
+output and the activity fraction is computed over the ROI area.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+def parse_polygon(text: str) -> list:
+    """``"x1,y1;x2,y2;x3,y3"`` -> ``[[x1, y1], [x2, y2], [x3, y3]]``."""
+    pts = []
+    for pair in text.split(";"):
+        pair = pair.strip()
+        if not pair:
+            continue
+        x, y = pair.split(",")
+        pts.append([float(x), float(y)])
+    if len(pts) < 3:
+        raise ValueError(f"Un polígono necesita al menos 3 puntos: {text!r}")
+    return pts
+
+
+class RoiMask:
+    """Include/exclude polygons bound to a given analysis resolution."""
+
+    def __init__(self, include=None, exclude=None, units: str = "norm") -> None:
+        if units not in ("norm", "px"):
+            raise ValueError(f"Unidades de ROI desconocidas: {units}")
+        self.include = [np.asarray(p, np.float32) for p in (include or [])]
+        self.exclude = [np.asarray(p, np.float32) for p in (exclude or [])]
+        self.units = units
+        self.size = None
+        self.src_size = (0, 0)
+        self.bbox = None
+        self.mask = None
+        self.area = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.include or self.exclude)
+
+    def _to_px(self, poly, w, h, src_w, src_h):
+        if self.units == "norm":
+            scale = np.array([w, h], np.float32)
+        else:
+            scale = np.array([w / float(src_w or w), h / float(src_h or h)], np.float32)
+        return np.round(poly * scale).astype(np.int32)
+
+    def bind(self, w: int, h: int, src_w: int = 0, src_h: int = 0) -> "RoiMask":
+        """Rasterise the polygons at ``w`` x ``h`` and compute the crop box."""
+        full = np.zeros((h, w), np.uint8)
+        if self.include:
+            cv2.fillPoly(full, [self._to_px(p, w, h, src_w, src_h) for p in self.include], 255)
+        else:
+            full[:] = 255
+        if self.exclude:
+            cv2.fillPoly(full, [self._to_px(p, w, h, src_w, src_h) for p in self.exclude], 0)
+        x, y, bw, bh = cv2.boundingRect(full)
+        if bw == 0 or bh == 0:
+            raise ValueError("La ROI no cubre ningún pixel del frame.")
+        self.size = (w, h)
+        self.src_size = (src_w, src_h)
+        self.bbox = (x, y, x + bw, y + bh)
+        self.mask = np.ascontiguousarray(full[y:y + bh, x:x + bw])
+        self.area = int(cv2.countNonZero(self.mask))
+        return self
+
+    def crop(self, frame):
+        x0, y0, x1, y1 = self.bbox
+        return frame[y0:y1, x0:x1]
+
+    def apply(self, mask):
+        """Zero the engine mask outside the polygons (in place)."""
+        return cv2.bitwise_and(mask, self.mask, dst=mask)
+
+    def expand(self, mask):
+        """Paste a crop-sized mask back into a full analysis-size frame (for display)."""
+        w, h = self.size
+        full = np.zeros((h, w), mask.dtype)
+        x0, y0, x1, y1 = self.bbox
+        full[y0:y1, x0:x1] = mask
+        return full
+
+    def draw(self, img, color_in=(0, 200, 255), color_out=(0, 0, 255)) -> None:
+        """Outline the polygons on a display frame of any size."""
+        h, w = img.shape[:2]
+        for polys, color in ((self.include, color_in), (self.exclude, color_out)):
+            if polys:
+                pts = [self._to_px(p, w, h, *self.src_size) for p in polys]
+                cv2.polylines(img, pts, True, color, 2, cv2.LINE_AA)
+
+
+def load_roi(src: str, config_path: str = "", include=None, exclude=None) -> Optional[RoiMask]:
+    """ROI for ``src`` from ``--roi``/``--exclude`` strings or the JSON config.
+
+    The config is looked up by the exact source string, its basename,
+    ``cam_N`` for camera indices and finally ``"default"``.
+    """
+    if include or exclude:
+        return RoiMask([parse_polygon(p) for p in include or []],
+                       [parse_polygon(p) for p in exclude or []])
+    if not config_path:
+        return None
+    with open(config_path, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    src = str(src)
+    keys = [src, os.path.basename(src)]
+    if src.isdigit():
+        keys.append(f"cam_{src}")
+    keys.append("default")
+    for key in keys:
+        if key in cfg:
+            entry = cfg[key]
+            return RoiMask(entry.get("include"), entry.get("exclude"), entry.get("units", "norm"))
+    return None
@@ -0,0 +1,33 @@
+"""Analysis-resolution helpers.
+
+Engines do not need display detail to decide whether a station is active, so
+frames are shrunk for analysis independently of the display/output size:
+one ``INTER_AREA`` resize (anti-aliased, cheap for downscaling) followed by
+optional ``pyrDown`` levels.
+"""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import cv2
+
+
+def analysis_size(src_w: int, src_h: int, width: int, pyr_levels: int = 0) -> Tuple[int, int]:
+    """Size of the analysis frame for a ``src_w`` x ``src_h`` source."""
+    w = max(1, min(int(width), src_w)) if width and width > 0 else src_w
+    h = max(1, int(round(src_h * w / float(src_w))))
+    for _ in range(max(0, pyr_levels)):
+        w, h = (w + 1) // 2, (h + 1) // 2
+    return w, h
+
+
+def to_analysis(frame, width: int, pyr_levels: int = 0):
+    """Downscale ``frame`` to ``width`` px (``INTER_AREA``) and apply ``pyr_levels`` pyrDowns."""
+    h, w = frame.shape[:2]
+    if width and 0 < width < w:
+        frame = cv2.resize(frame, (int(width), max(1, int(round(h * width / float(w))))),
+                           interpolation=cv2.INTER_AREA)
+    for _ in range(max(0, pyr_levels)):
+        frame = cv2.pyrDown(frame)
+    return frame
@@ -1,8 +1,332 @@
+"""Score smoothing.
+
+``moving_avg`` is the original helper (kept for compatibility).  The streaming
+filters below update in O(1) (SMA, EMA, max) or O(log k) (median) without
+allocating per frame, and each has a ``*_batch`` counterpart that processes a
+whole score array and returns exactly the same values as feeding the samples
+one by one -- useful for offline replay and tuning.
+
+All windows behave like ``moving_avg`` while warming up: with fewer than
+``k`` samples the statistic is computed over the samples seen so far.
+
+When the analysis rate varies (``--adaptive``) a window of ``k`` samples no
+longer spans a fixed time, so every filter also has a time-window variant
+(:func:`make_smoother` with ``seconds > 0``) that keeps the samples of the
+last ``seconds`` of the clock passed to ``update(x, t)``; the EMA uses
+``seconds`` as its time constant.  :func:`smooth_batch_time` is the matching
+offline version.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from collections import deque
+
 import numpy as np
 
+
 def moving_avg(vals, k):
     if not vals:
         return 0.0
     if len(vals) < k:
         return float(np.mean(vals))
     return float(np.mean(list(vals)[-k:]))
+
+
+class StreamingSMA:
+    """Simple moving average over the last ``k`` samples.
+
+    Keeps a running cumulative sum and a ring of past cumulative sums so the
+    mean is ``(C[i] - C[i-k]) / n`` -- the same arithmetic as :func:`sma_batch`.
+    """
+
+    def __init__(self, k: int) -> None:
+        self.k = max(1, int(k))
+        self.ring = np.zeros(self.k, np.float64)
+        self.reset()
+
+    def reset(self) -> None:
+        self.total = 0.0
+        self.n = 0
+        self.value = 0.0
+        self.ring.fill(0.0)
+
+    def update(self, x: float, t: float = 0.0) -> float:
+        idx = self.n % self.k
+        old = self.ring[idx]           # C[i-k] (0.0 mientras la ventana se llena)
+        self.total += float(x)
+        self.ring[idx] = self.total
+        self.n += 1
+        self.value = (self.total - old) / min(self.n, self.k)
+        return self.value
+
+
+class StreamingEMA:
+    """Exponential moving average; ``alpha`` defaults to ``2 / (k + 1)``."""
+
+    def __init__(self, k: int = 8, alpha: float = 0.0) -> None:
+        self.k = max(1, int(k))
+        self.alpha = float(alpha) if alpha > 0 else 2.0 / (self.k + 1)
+        self.reset()
+
+    def reset(self) -> None:
+        self.n = 0
+        self.value = 0.0
+
+    def update(self, x: float, t: float = 0.0) -> float:
+        x = float(x)
+        self.value = x if self.n == 0 else self.value + self.alpha * (x - self.value)
+        self.n += 1
+        return self.value
+
+
+class StreamingMedian:
+    """Rolling median: ring buffer plus a sorted window (bisect, O(log k) search)."""
+
+    def __init__(self, k: int) -> None:
+        self.k = max(1, int(k))
+        self.reset()
+
+    def reset(self) -> None:
+        self.ring = deque(maxlen=self.k)
+        self.sorted = []
+        self.value = 0.0
+
+    def update(self, x: float, t: float = 0.0) -> float:
+        x = float(x)
+        if len(self.ring) == self.k:
+            del self.sorted[bisect_left(self.sorted, self.ring[0])]
+        self.ring.append(x)
+        insort(self.sorted, x)
+        n = len(self.sorted)
+        m = n // 2
+        self.value = self.sorted[m] if n % 2 else (self.sorted[m - 1] + self.sorted[m]) / 2.0
+        return self.value
+
+
+class StreamingMax:
+    """Rolling maximum with a monotonic deque (amortised O(1))."""
+
+    def __init__(self, k: int) -> None:
+        self.k = max(1, int(k))
+        self.reset()
+
+    def reset(self) -> None:
+        self.window = deque()          # (índice, valor) con valores decrecientes
+        self.n = 0
+        self.value = 0.0
+
+    def update(self, x: float, t: float = 0.0) -> float:
+        x = float(x)
+        while self.window and self.window[-1][1] <= x:
+            self.window.pop()
+        self.window.append((self.n, x))
+        if self.window[0][0] <= self.n - self.k:
+            self.window.popleft()
+        self.n += 1
+        self.value = self.window[0][1]
+        return self.value
+
+
+def _as_scores(x) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64).ravel()
+
+
+def sma_batch(x, k: int) -> np.ndarray:
+    x = _as_scores(x)
+    k = max(1, int(k))
+    c = np.cumsum(x)
+    prev = np.zeros_like(c)
+    prev[k:] = c[:-k]
+    return (c - prev) / np.minimum(np.arange(1, len(x) + 1), k)
+
+
+def ema_batch(x, k: int = 8, alpha: float = 0.0) -> np.ndarray:
+    x = _as_scores(x)
+    a = float(alpha) if alpha > 0 else 2.0 / (max(1, int(k)) + 1)
+    out = np.empty_like(x)
+    if len(x) == 0:
+        return out
+    # recurrencia: bucle sobre floats nativos (misma aritmética que StreamingEMA)
+    y = float(x[0])
+    for i, v in enumerate(x.tolist()):
+        y = y + a * (v - y)
+        out[i] = y
+    return out
+
+
+def _rolling(x, k, reduce):
+    x = _as_scores(x)
+    k = max(1, int(k))
+    out = np.empty_like(x)
+    head = min(k - 1, len(x))
+    for i in range(head):            # ventanas parciales al inicio
+        out[i] = reduce(x[:i + 1])
+    if len(x) >= k:
+        out[k - 1:] = reduce(np.lib.stride_tricks.sliding_window_view(x, k), axis=-1) \
+            if k > 1 else x
+    return out
+
+
+def median_batch(x, k: int) -> np.ndarray:
+    return _rolling(x, k, np.median)
+
+
+def max_batch(x, k: int) -> np.ndarray:
+    return _rolling(x, k, np.max)
+
+
+class TimeWindowSMA:
+    """Mean of the samples with ``t > now - seconds`` (same arithmetic as :func:`smooth_batch_time`)."""
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = float(seconds)
+        self.reset()
+
+    def reset(self) -> None:
+        self.window = deque()          # (t, suma acumulada antes de la muestra)
+        self.total = 0.0
+        self.value = 0.0
+
+    def update(self, x: float, t: float = 0.0) -> float:
+        self.window.append((t, self.total))
+        self.total += float(x)
+        limit = t - self.seconds
+        while self.window[0][0] <= limit:
+            self.window.popleft()
+        self.value = (self.total - self.window[0][1]) / len(self.window)
+        return self.value
+
+
+class TimeWindowEMA:
+    """EMA with time constant ``seconds``: ``alpha = 1 - exp(-dt / seconds)``."""
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = max(1e-9, float(seconds))
+        self.reset()
+
+    def reset(self) -> None:
+        self.n = 0
+        self.t = 0.0
+        self.value = 0.0
+
+    def update(self, x: float, t: float = 0.0) -> float:
+        x = float(x)
+        if self.n == 0:
+            self.value = x
+        else:
+            a = 1.0 - np.exp(-max(0.0, t - self.t) / self.seconds)
+            self.value = self.value + a * (x - self.value)
+        self.t = t
+        self.n += 1
+        return self.value
+
+
+class TimeWindowMedian:
+    """Median of the samples of the last ``seconds``."""
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = float(seconds)
+        self.reset()
+
+    def reset(self) -> None:
+        self.window = deque()
+        self.sorted = []
+        self.value = 0.0
+
+    def update(self, x: float, t: float = 0.0) -> float:
+        x = float(x)
+        self.window.append((t, x))
+        insort(self.sorted, x)
+        limit = t - self.seconds
+        while self.window[0][0] <= limit:
+            del self.sorted[bisect_left(self.sorted, self.window.popleft()[1])]
+        n = len(self.sorted)
+        m = n // 2
+        self.value = self.sorted[m] if n % 2 else (self.sorted[m - 1] + self.sorted[m]) / 2.0
+        return self.value
+
+
+class TimeWindowMax:
+    """Maximum of the samples of the last ``seconds`` (monotonic deque)."""
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = float(seconds)
+        self.reset()
+
+    def reset(self) -> None:
+        self.window = deque()          # (t, valor) con valores decrecientes
+        self.value = 0.0
+
+    def update(self, x: float, t: float = 0.0) -> float:
+        x = float(x)
+        while self.window and self.window[-1][1] <= x:
+            self.window.pop()
+        self.window.append((t, x))
+        limit = t - self.seconds
+        while self.window[0][0] <= limit:
+            self.window.popleft()
+        self.value = self.window[0][1]
+        return self.value
+
+
+TIME_SMOOTHERS = {
+    "sma": TimeWindowSMA,
+    "ema": TimeWindowEMA,
+    "median": TimeWindowMedian,
+    "max": TimeWindowMax,
+}
+
+
+SMOOTHERS = {
+    "sma": (StreamingSMA, sma_batch),
+    "ema": (StreamingEMA, ema_batch),
+    "median": (StreamingMedian, median_batch),
+    "max": (StreamingMax, max_batch),
+}
+
+
+def make_smoother(name: str, k: int, seconds: float = 0.0):
+    """Streaming filter ``name`` (``sma``/``ema``/``median``/``max``) over ``k`` samples,
+    or over the last ``seconds`` of the clock when ``seconds > 0``."""
+    try:
+        if seconds > 0:
+            return TIME_SMOOTHERS[name](seconds)
+        return SMOOTHERS[name][0](k)
+    except KeyError:
+        raise ValueError(f"Suavizado desconocido: {name}") from None
+
+
+def smooth_batch(name: str, x, k: int) -> np.ndarray:
+    """Batch counterpart of :func:`make_smoother` over a whole score array (SMA, median and
+    max are vectorised; the EMA is a recurrence and runs as a plain float loop)."""
+    try:
+        return SMOOTHERS[name][1](x, k)
+    except KeyError:
+        raise ValueError(f"Suavizado desconocido: {name}") from None
+
+
+def smooth_batch_time(name: str, t, x, seconds: float) -> np.ndarray:
+    """Offline counterpart of ``make_smoother(name, k, seconds)`` on timestamps ``t``.
+
+    The SMA is vectorised (cumulative sums and ``searchsorted``); the other
+    filters replay the streaming implementation, which is still far cheaper
+    than decoding the video.
+    """
+    t = np.asarray(t, dtype=np.float64).ravel()
+    x = _as_scores(x)
+    if name == "sma":
+        c = np.cumsum(x)
+        first = np.searchsorted(t, t - float(seconds), side="right")
+        prev = np.where(first > 0, c[np.maximum(first - 1, 0)], 0.0)
+        return (c - prev) / (np.arange(1, len(x) + 1) - first)
+    f = make_smoother(name, 1, seconds)
+    return np.fromiter((f.update(v, ts) for v, ts in zip(x, t)), np.float64, len(x))
+
+
+def smooth_trace(name: str, t, x, k: int, seconds: float = 0.0) -> np.ndarray:
+    """Offline counterpart of ``make_smoother(name, k, seconds)``: picks
+    :func:`smooth_batch_time` when ``seconds > 0`` and :func:`smooth_batch` otherwise."""
+    if seconds > 0:
+        return smooth_batch_time(name, t, x, seconds)
+    return smooth_batch(name, x, k)
@@ -0,0 +1,117 @@
+"""Opt-in per-stage latency timers for the frame loop.
+
+:class:`StageTimer` keeps the last ``window`` samples of every stage in a
+preallocated ``int64`` ring (one ``perf_counter_ns`` call and one array store
+per measurement); percentiles are only computed when a report is requested.
+The loop calls :meth:`StageTimer.mark` once per frame and
+:meth:`StageTimer.lap` after each stage, so a lap measures the time since the
+previous one.  Work done on other threads (e.g. the video writer) reports
+durations with :meth:`StageTimer.add`.
+
+When timing is disabled the loop gets :data:`NULL_TIMER`, whose methods do
+nothing, so the hot path has no branches and no measurable cost.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+class StageTimer:
+    """Rolling latency samples per stage (nanoseconds)."""
+
+    enabled = True
+
+    def __init__(self, stages: Iterable[str] = (), window: int = 512) -> None:
+        self.window = max(1, int(window))
+        self.rings: Dict[str, np.ndarray] = {}
+        self.counts: Dict[str, int] = {}
+        self.totals: Dict[str, int] = {}  # ns acumulados desde el inicio (``_sum`` de Prometheus)
+        self._last = time.perf_counter_ns()
+        for name in stages:
+            self._ring(name)
+
+    def _ring(self, name: str) -> np.ndarray:
+        ring = self.rings.get(name)
+        if ring is None:
+            ring = self.rings[name] = np.zeros(self.window, np.int64)
+            self.counts[name] = 0
+            self.totals[name] = 0
+        return ring
+
+    def mark(self) -> None:
+        self._last = time.perf_counter_ns()
+
+    def lap(self, name: str) -> None:
+        now = time.perf_counter_ns()
+        self.add(name, now - self._last)
+        self._last = now
+
+    def add(self, name: str, ns: int) -> None:
+        ring = self.rings.get(name)
+        if ring is None:
+            ring = self._ring(name)
+        n = self.counts[name]
+        ring[n % self.window] = ns
+        self.counts[name] = n + 1
+        self.totals[name] += ns
+
+    def stats(self) -> Dict[str, dict]:
+        """``{stage: {"n", "sum_s", "p50_ms", "p95_ms", "p99_ms"}}``: percentiles over the
+        current window, ``n`` and ``sum_s`` (total seconds) since the timer started."""
+        out = {}
+        for name, ring in list(self.rings.items()):  # puede leerse desde otro hilo
+            n = self.counts.get(name, 0)
+            if not n:
+                continue
+            p = np.percentile(ring[:min(n, self.window)], PERCENTILES) / 1e6
+            out[name] = {"n": n, "sum_s": self.totals.get(name, 0) / 1e9,
+                         **{f"p{q}_ms": float(v) for q, v in zip(PERCENTILES, p)}}
+        return out
+
+    def log_line(self, stats: Optional[Dict[str, dict]] = None) -> str:
+        stats = self.stats() if stats is None else stats
+        return "  ".join(f"{k} {v['p50_ms']:.2f}/{v['p95_ms']:.2f}/{v['p99_ms']:.2f}"
+                         for k, v in stats.items())
+
+
+class _NullTimer:
+    enabled = False
+
+    def mark(self) -> None:
+        pass
+
+    def lap(self, name: str) -> None:
+        pass
+
+    def add(self, name: str, ns: int) -> None:
+        pass
+
+    def stats(self) -> Dict[str, dict]:
+        return {}
+
+
+NULL_TIMER = _NullTimer()
+
+
+class TimingLog:
+    """Append one JSON object per report (JSON Lines) for offline analysis."""
+
+    def __init__(self, path: str, src: str = "") -> None:
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.path = path
+        self.src = src
+
+    def write(self, stats: Dict[str, dict], frames: int) -> None:
+        rec = {"ts": time.time(), "src": self.src, "frames": frames, "stages": stats}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec) + "\n")